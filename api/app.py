@@ -1,4 +1,6 @@
+import asyncio
 import os
+import time
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
@@ -7,13 +9,17 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import PlainTextResponse, StreamingResponse, JSONResponse
 
 from .graphbot.store.base_store import ObjectNotFoundError
+from .graphbot.chats.chatbot.search_scheduler import SearchRejectedError
+from .graphbot.graph.service import LayoutPendingError
 from .assay_finder.router import router as assay_router
 from .gap_finder.router import router as gap_router
 from .graphbot.chats.router import router as graph_chat_router
+from .graphbot.graph.router import router as graph_router
+from .osdr.router import router as osdr_router
 
 from .graphbot.chats.service import ChatService
 from .graphbot.settings import settings
-from .graphbot.factory import make_store, make_chatbot
+from .graphbot.factory import make_store, make_chatbot, make_graph_service, make_osdr_client, make_catalog_mirror, make_gap_facets
 
 from .ai import OpenAIProvider
 
@@ -34,16 +40,89 @@ def key_func(request: Request) -> str:
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     app.state.settings = settings
-
-    store = make_store(settings)
-    chatbot = make_chatbot(settings)
-
-    app.state.chat_service = ChatService(store, chatbot)
-    
     app.state.provider = OpenAIProvider(api_key=os.getenv("OPENAI_API_KEY"))
+    # Una sola conexión (pool) a OSDR para todas las búsquedas
+    app.state.osdr = make_osdr_client(settings)
+    # Foto local del catálogo de OSDR, sincronizada en segundo plano
+    app.state.osdr_catalog = make_catalog_mirror(settings, app.state.osdr)
+    catalog_task = asyncio.create_task(app.state.osdr_catalog.run()) if app.state.osdr_catalog else None
+    # Opciones de /gaps/options precalculadas y refrescadas periódicamente
+    app.state.gap_facets = make_gap_facets(settings, app.state.osdr, app.state.osdr_catalog)
+    facets_task = asyncio.create_task(app.state.gap_facets.run()) if app.state.gap_facets else None
+
+    # El índice se carga en segundo plano: "/" responde ya (liveness) y "/ready"
+    # sólo cuando el calentamiento termina. Chat y grafo arrancan por separado
+    app.state.readiness = {"status": "starting", "timings_ms": {}, "error": None, "attempts": 0}
+    chat_task = asyncio.create_task(warm_up_chat(app))
+    graph_task = asyncio.create_task(warm_up_graph(app))
 
     yield
 
+    for task in (chat_task, graph_task, catalog_task, facets_task):
+        if task is not None:
+            task.cancel()
+    chatbot = getattr(app.state, "chatbot", None)
+    if chatbot is not None:
+        chatbot.close()
+    await app.state.osdr.aclose()
+
+
+async def warm_up_graph(app: FastAPI) -> None:
+    timings = app.state.readiness["timings_ms"]
+    try:
+        start = time.perf_counter()
+        graph_service = await asyncio.to_thread(make_graph_service, settings)
+        # Índice CSR; su primera carga lanza también el layout en un hilo aparte
+        await asyncio.to_thread(graph_service.index)
+        app.state.graph_service = graph_service
+        timings["graph"] = round(1000 * (time.perf_counter() - start), 1)
+
+        # Layout leído del disco o calculado una vez por versión
+        start = time.perf_counter()
+        await asyncio.to_thread(graph_service.layout)
+        timings["layout"] = round(1000 * (time.perf_counter() - start), 1)
+    except Exception:
+        # La API del grafo es independiente del chat
+        logger.exception("Could not load the graph index")
+
+
+async def warm_up_chat(app: FastAPI) -> None:
+    readiness = app.state.readiness
+    timings = readiness["timings_ms"]
+
+    # Un fallo al cargar (índice a medio escribir, red) se reintenta con espera exponencial
+    delay = settings.warmup_retry_backoff
+    while True:
+        readiness["attempts"] += 1
+        try:
+            start = time.perf_counter()
+            store = make_store(settings)
+            # Import de graphrag, parquet, vector stores y prompts: fuera del event loop
+            chatbot = await asyncio.to_thread(make_chatbot, settings)
+            app.state.chatbot = chatbot
+            timings["load"] = round(1000 * (time.perf_counter() - start), 1)
+            break
+        except Exception as e:
+            logger.exception("Could not load the chatbot; retrying in %.0f s", delay)
+            readiness.update(status="retrying", error=str(e))
+            await asyncio.sleep(delay)
+            delay = min(2 * delay, settings.warmup_retry_max_delay)
+    readiness["error"] = None
+
+    if settings.warmup_query:
+        start = time.perf_counter()
+        try:
+            await chatbot.warm_up(settings.warmup_query)
+        except Exception as e:
+            # El índice está cargado; un fallo puntual del LLM no debe dejar la instancia fuera
+            logger.warning("Warm-up query failed: %s", e)
+            readiness["error"] = str(e)
+        timings["warmup_query"] = round(1000 * (time.perf_counter() - start), 1)
+
+    app.state.chat_service = ChatService(store, chatbot)
+    readiness["status"] = "ready"
+    logger.info("Chat backend ready: %s", timings)
+
 app = FastAPI(
     title="Chatbot API",
     version="1.0.0",
@@ -65,11 +144,26 @@ app.add_middleware(CORSMiddleware,
 async def object_not_found_handler(request: Request, exc: ObjectNotFoundError):
     return JSONResponse(status_code=404, content={"detail": f"Object not found: {exc}"})
 
+@app.exception_handler(SearchRejectedError)
+async def search_rejected_handler(request: Request, exc: SearchRejectedError):
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+@app.exception_handler(LayoutPendingError)
+async def layout_pending_handler(request: Request, exc: LayoutPendingError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
 
 app.include_router(assay_router, prefix="/api/v1")
 app.include_router(gap_router, prefix="/api/v1")
 app.include_router(graph_chat_router, prefix="/api/v1/chats")
+app.include_router(graph_router, prefix="/api/v1/graph")
+app.include_router(osdr_router, prefix="/api/v1/osdr")
 
 @app.get("/")
 def root():
     return {"status": "ok"}
+
+@app.get("/ready")
+def ready():
+    readiness = app.state.readiness
+    return JSONResponse(status_code=200 if readiness["status"] == "ready" else 503, content=readiness)
@@ -1,9 +1,14 @@
-import httpx
+import asyncio
 from typing import Optional, List, Tuple, Any, Dict
 from urllib.parse import quote
 from fastapi import APIRouter, HTTPException, Query, Request
 import logging
 from ..ai import GetFilterPrompt
+from ..osdr import (
+    ASSAYS_BASE, META_BASE, DATASET_BASE, OsdrClient, Prefetch,
+    applied_url, get_catalog, get_osdr, known_organisms, start_prefetch,
+)
+from ..utils import CursorError, ResultStore, SingleFlight
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,11 +20,13 @@ load_dotenv()
 
 router = APIRouter()
 
-ASSAYS_BASE = "https://visualization.osdr.nasa.gov/biodata/api/v2/query/assays/"
-META_BASE = "https://visualization.osdr.nasa.gov/biodata/api/v2/query/metadata/"
-DATASET_BASE = "https://visualization.osdr.nasa.gov/biodata/api/v2/dataset"
 DEFAULT_FORMAT = "json.records"
 
+# Peticiones idénticas concurrentes (IA y OSDR) comparten una sola llamada
+_flights = SingleFlight()
+# Tarjetas ya calculadas (listado sin agrupar), para las páginas siguientes por cursor.
+# La deduplicación necesita todas las filas: la paginación acota la respuesta, no el cálculo
+_results = ResultStore()
 
 
 
@@ -29,42 +36,44 @@ async def search_assays(
     q: Optional[str] = Query(None, description="User input in natural language"),
     group_by_technology: bool = Query(True, description="Group results by technology"),
     limit_per_tech: int = Query(3, ge=1, le=50, description="Max assays per technology group"),
-    exclude_na: bool = Query(True, description="Hide 'Not Applicable' conditions in groups")
+    exclude_na: bool = Query(True, description="Hide 'Not Applicable' conditions in groups"),
+    page_size: Optional[int] = Query(None, ge=1, le=1000, description="Cards per page when not grouping (default: all)"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page; other filters are ignored"),
 ):
+    if cursor:
+        # Página siguiente del resultado guardado: sin IA ni OSDR
+        try:
+            result, page, next_cursor = _results.next_page(cursor, page_size)
+        except CursorError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        return {**result.meta, "cards": page, "next_cursor": next_cursor}
+
     logger.info("Searching assays with parameters: %s", locals())
     logger.info(f"OpenAI API Key: {os.getenv('OPENAI_API_KEY')} router")
-    # 1) NL -> filtros
-    params = _get_filter_from_natural_language(request, q)
+    # 1) NL -> filtros; mientras tanto se descarga de OSDR un superconjunto probable
+    prefetch = start_prefetch(request, q)
+    try:
+        params = await _get_filter_from_natural_language(request, q)
+    except BaseException:
+        if prefetch is not None:
+            prefetch.cancel()
+        raise
 
     # 2) Fetch OSDR
     osdr_query_params = _build_params(**params)
-    data = await _fetch_assays(osdr_query_params)
-
-    logger.info("Fetched OSDR data: %s", data)
-
-    async with httpx.AsyncClient() as c:
-        applied_url = str(c.build_request("GET", ASSAYS_BASE, params=osdr_query_params).url)
-
-    # 3) Simplifica filas crudas
-    simplified: List[Dict[str, Any]] = []
-    for row in data:
-        ds = row.get("id.accession")
-        an = row.get("id.assay name")
-        simplified.append({
-            "dataset": ds,
-            "assay_name": an,
-            "organism": row.get("study.characteristics.organism"),
-            "spaceflight_condition": row.get("study.factor value.spaceflight"),
-            "assay_technology": _normalize_tech_label(row.get("investigation.study assays.study assay technology type")),
-            "link": _build_assay_html_link(ds, an),
-            "dataset_link": _build_dataset_html_link(ds),
-        })
+    # 3) Filas simplificadas, según llegan de OSDR
+    simplified = await _fetch_assays(request, osdr_query_params, prefetch)
+
+    logger.info("Fetched %d OSDR rows", len(simplified))
+
+    url = applied_url(ASSAYS_BASE, osdr_query_params)
 
     # 4) Dedup por (dataset, assay)
     cards = _dedup_cards(simplified)
 
     if not group_by_technology:
-        return {"applied_url": applied_url, "count": len(cards), "cards": cards}
+        page, next_cursor = _results.first_page(cards, page_size, meta={"applied_url": url, "count": len(cards)})
+        return {"applied_url": url, "count": len(cards), "cards": page, "next_cursor": next_cursor}
 
     # 5) Agrupa por tecnología y recorta a top-K por grupo
     groups = _group_by_technology(cards, limit_per_tech=limit_per_tech, exclude_na=exclude_na)
@@ -73,11 +82,17 @@ async def search_assays(
 
 # ----------------- AI -----------------
 
-def _get_filter_from_natural_language(request: Request, user_input) -> Dict[str, Optional[str]]:
+async def _get_filter_from_natural_language(request: Request, user_input) -> Dict[str, Optional[str]]:
+    key = ("filter", " ".join((user_input or "").lower().split()))
+    provider = request.app.state.provider
+    # El provider es síncrono: lo sacamos del loop
+    return await _flights.do(key, lambda: asyncio.to_thread(_prompt_filter, provider, user_input))
+
+def _prompt_filter(provider, user_input) -> Dict[str, Optional[str]]:
     logger.info("estoy aqui 1")
     prompt = GetFilterPrompt(user_input)
     logger.info("estoy aqui 2")
-    response_text, _ = request.app.state.provider.prompt(
+    response_text, _ = provider.prompt(
         model="gpt-3.5-turbo",
         prompt_system=prompt.get_prompt_system(),
         messages_json="",
@@ -283,18 +298,43 @@ def _build_params(
 
     return params
 
-async def _fetch_assays(params: List[Tuple[str, str]]) -> Any:
-    try:
-        logger.info("Fetching assays with params: %s", params)
-        async with httpx.AsyncClient(timeout=20.0, follow_redirects=True) as client:
-            logger.info("Requesting OSDR: %s", ASSAYS_BASE)
-            r = await client.get(ASSAYS_BASE, params=params)
-            logger.info("OSDR response status: %s", r.status_code)
-            if r.status_code >= 400:
-                raise HTTPException(status_code=r.status_code, detail=f"OSDR error: {r.text}")
-            return r.json()
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error("Error fetching assays: %s", e)
-        raise HTTPException(status_code=502, detail=f"Error consultando OSDR: {e}")
+def _simplify_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    ds = row.get("id.accession")
+    an = row.get("id.assay name")
+    return {
+        "dataset": ds,
+        "assay_name": an,
+        "organism": row.get("study.characteristics.organism"),
+        "spaceflight_condition": row.get("study.factor value.spaceflight"),
+        "assay_technology": _normalize_tech_label(row.get("investigation.study assays.study assay technology type")),
+        "link": _build_assay_html_link(ds, an),
+        "dataset_link": _build_dataset_html_link(ds),
+    }
+
+async def _fetch_assays(
+    request: Request,
+    params: List[Tuple[str, str]],
+    prefetch: Optional[Prefetch] = None,
+) -> List[Dict[str, Any]]:
+    # Primero el espejo local del catálogo; OSDR sólo si no hay foto o la consulta no se puede evaluar aquí
+    mirror = get_catalog(request)
+    if mirror is not None:
+        rows = await asyncio.to_thread(mirror.query, params)
+        if rows is not None:
+            if prefetch is not None:
+                prefetch.cancel()
+            return [_simplify_row(row) for row in rows]
+
+    # Después, el superconjunto descargado durante la llamada a la IA, filtrado en local
+    if prefetch is not None:
+        rows = await prefetch.query(params, known_organisms(request.app.state))
+        if rows is not None:
+            return [_simplify_row(row) for row in rows]
+
+    osdr = get_osdr(request)
+    return await _flights.do(("assays", tuple(params)), lambda: _fetch_assays_once(osdr, params))
+
+async def _fetch_assays_once(osdr: OsdrClient, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    logger.info("Fetching assays with params: %s", params)
+    # Cada fila se simplifica al llegar: nunca se tiene la respuesta cruda entera en memoria
+    return [_simplify_row(row) async for row in osdr.iter_records(ASSAYS_BASE, params, timeout=20.0)]
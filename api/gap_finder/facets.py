@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from email.utils import formatdate
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FacetSnapshot:
+    options: Dict[str, Any]
+    body: bytes
+    etag: str
+    generated_at: float
+
+    @property
+    def last_modified(self) -> str:
+        return formatdate(self.generated_at, usegmt=True)
+
+
+class FacetIndex:
+    """
+    Opciones de `/gaps/options` (organismos, assays, condiciones y tejidos) en memoria.
+
+    Una tarea del lifespan las recalcula cada `interval` segundos; el endpoint sólo
+    devuelve el cuerpo JSON ya serializado. Si el recálculo da lo mismo se conserva
+    la foto anterior (mismo ETag y fecha), así el navegador sigue recibiendo 304.
+    Con `ready`, el primer cálculo espera a que termine (p. ej. la primera foto del
+    espejo del catálogo) en lugar de descargar lo mismo en paralelo.
+    """
+
+    def __init__(
+        self,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+        interval: float = 3600.0,
+        ready: Optional[Callable[[], Awaitable[Any]]] = None,
+    ):
+        self.compute = compute
+        self.interval = interval
+        self.ready = ready
+        self.snapshot: Optional[FacetSnapshot] = None
+        self.checked_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Seguimos sirviendo la foto anterior
+                logger.warning("Could not refresh the gap options: %s", e)
+                self.last_error = str(e)
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self) -> FacetSnapshot:
+        return await self._refresh_locked(force=True)
+
+    async def _refresh_locked(self, force: bool) -> FacetSnapshot:
+        async with self._lock:
+            # Quien esperaba el lock mientras otro calculaba la primera foto ya la tiene
+            if not force and self.snapshot is not None:
+                return self.snapshot
+            if self.ready is not None:
+                await self.ready()
+            options = await self.compute()
+            self.checked_at = time.time()
+            self.last_error = None
+
+            payload = json.dumps(options, ensure_ascii=False, sort_keys=True).encode()
+            etag = f'"{hashlib.sha1(payload).hexdigest()[:16]}"'
+            if self.snapshot is None or self.snapshot.etag != etag:
+                generated_at = time.time()
+                body = json.dumps({**options, "snapshot_at": generated_at}, ensure_ascii=False).encode()
+                self.snapshot = FacetSnapshot(options, body, etag, generated_at)
+                logger.info("Gap options refreshed (%s)", {k: len(v) for k, v in options.items()})
+            return self.snapshot
+
+    async def get(self) -> FacetSnapshot:
+        """Foto actual; la primera petición antes del primer recálculo espera a que termine."""
+        return self.snapshot or await self._refresh_locked(force=False)
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self.snapshot
+        return {
+            "snapshot_at": snapshot.generated_at if snapshot is not None else None,
+            "etag": snapshot.etag if snapshot is not None else None,
+            "checked_at": self.checked_at,
+            "last_error": self.last_error,
+        }
@@ -1,20 +1,25 @@
-import httpx
-from typing import Optional, List, Tuple, Any, Dict, Set
+import asyncio
+from typing import Optional, List, Tuple, Any, AsyncIterator, Dict, Set
 from urllib.parse import quote
-from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from collections import defaultdict, Counter
 import itertools
 
 # ⬇️ Asegúrate de tener este prompt en tu proyecto (como ya lo tienes)
 from ..ai import GetGapFilterPrompt
+from ..utils import CursorError, ResultStore
+from ..osdr import (
+    ASSAYS_BASE, META_BASE, DATASET_BASE, CatalogMirror, OsdrClient, Prefetch,
+    applied_url, get_catalog, get_osdr, known_organisms, start_prefetch,
+)
 
 router = APIRouter()
 
-ASSAYS_BASE = "https://visualization.osdr.nasa.gov/biodata/api/v2/query/assays/"
-META_BASE = "https://visualization.osdr.nasa.gov/biodata/api/v2/query/metadata/"
-DATASET_BASE = "https://visualization.osdr.nasa.gov/biodata/api/v2/dataset"
 DEFAULT_FORMAT = "json.records"
 
+# Listados de gaps ya calculados, para servir las páginas siguientes por cursor
+_results = ResultStore()
+
 # ----------------- helpers comunes (mismo estilo) -----------------
 
 def _add(params: List[Tuple[str, str]], key: str, value: str = ""):
@@ -24,20 +29,35 @@ def _add_presence(params: List[Tuple[str, str]], field: str):
     # En OSDR la “presencia” se expresa como &=field (campo anotado y no nulo)
     params.append((f"={field}", ""))
 
-async def _fetch_json_records(base: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
-    try:
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            r = await client.get(base, params=params)
-            if r.status_code >= 400:
-                raise HTTPException(status_code=r.status_code, detail=f"OSDR error: {r.text}")
-            data = r.json()
-            if not isinstance(data, list):
-                raise HTTPException(status_code=502, detail="Respuesta OSDR no es json.records (lista).")
-            return data
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Error consultando OSDR: {e}")
+async def _iter_json_records(
+    osdr: OsdrClient,
+    mirror: Optional[CatalogMirror],
+    base: str,
+    params: List[Tuple[str, str]],
+    prefetch: Optional[Prefetch] = None,
+    organisms_universe: Optional[List[str]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Filas de la consulta una a una (parseadas según llegan), para ir agregándolas."""
+    # El catálogo de assays se evalúa en local si hay foto; el resto va a OSDR
+    if mirror is not None and base == ASSAYS_BASE:
+        rows = await asyncio.to_thread(mirror.query, params)
+        if rows is not None:
+            if prefetch is not None:
+                prefetch.cancel()
+            for row in rows:
+                yield row
+            return
+
+    # Superconjunto descargado mientras la IA extraía los filtros, filtrado en local
+    if prefetch is not None:
+        rows = await prefetch.query(params, organisms_universe)
+        if rows is not None:
+            for row in rows:
+                yield row
+            return
+
+    async for row in osdr.iter_records(base, params, timeout=30.0):
+        yield row
 
 def _norm_str(x: Optional[str]) -> Optional[str]:
     if x is None:
@@ -174,10 +194,23 @@ def _nl_to_filters(request: Request, user_input: Optional[str]):
 # ----------------- /gaps/options -----------------
 
 @router.get("/gaps/options")
-async def gaps_options():
+async def gaps_options(request: Request):
     """
     Devuelve listas únicas observadas para poblar la UI (organisms, assays, conditions, tissues).
+    Se sirven del índice de facetas precalculado (con ETag y fecha de la foto) si está activo.
     """
+    facets = getattr(request.app.state, "gap_facets", None)
+    if facets is None:
+        return await compute_gap_options(get_osdr(request), get_catalog(request))
+
+    snapshot = await facets.get()
+    # no-cache: el navegador guarda la respuesta pero revalida siempre (304 si no cambió)
+    headers = {"ETag": snapshot.etag, "Last-Modified": snapshot.last_modified, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == snapshot.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+def _options_params() -> List[Tuple[str, str]]:
     params: List[Tuple[str, str]] = []
     _add(params, "format", DEFAULT_FORMAT)
     # Selectores (inclusiones en salida)
@@ -186,15 +219,18 @@ async def gaps_options():
     _add_presence(params, "study.factor value.spaceflight")
     # Traemos todo el branch de characteristics para rascar tejido
     _add(params, "study.characteristics")
+    return params
 
-    rows = await _fetch_json_records(ASSAYS_BASE, params)
+async def compute_gap_options(osdr: OsdrClient, mirror: Optional[CatalogMirror]) -> Dict[str, List[str]]:
+    """Recorre el catálogo de assays y reduce las filas a las cuatro listas de opciones."""
+    params = _options_params()
 
     organisms: Set[str] = set()
     conds: Set[str] = set()
     assays: Set[str] = set()
     tissues: Set[str] = set()
 
-    for row in rows:
+    async for row in _iter_json_records(osdr, mirror, ASSAYS_BASE, params):
         org = _norm_str(row.get("study.characteristics.organism"))
         if org:
             organisms.add(org)
@@ -223,23 +259,11 @@ async def gaps_options():
         "tissues": sorted(tissues),
     }
 
-# ----------------- /gaps/search (GET: ahora SOLO q) -----------------
-
-@router.get("/gaps/search")
-async def gaps_search(
-    request: Request,
-    q: Optional[str] = Query(None, description="Consulta libre; la IA la convierte a organisms/assays/condition/tissues"),
-    min_datasets_for_covered: int = Query(1, ge=1, description="Umbral datasets para covered"),
-    top_n: int = Query(20, ge=1, le=100, description="Número de gaps destacados (rankeados) a devolver"),
-):
-    """
-    Igual que tu endpoint actual, pero la UI solo manda `q`.
-    Por dentro, se mapea con IA a organisms/assays/condition/tissues y se reusa tu lógica tal cual.
-    """
-    # ⬇️ 1) IA → filtros
-    organisms, assays, condition, tissues = _nl_to_filters(request, q)
-
-    # 2) Construir params para /v2/query/assays/ (igual que tu flujo)
+def _build_gap_params(
+    organisms: List[str],
+    assays: List[str],
+    condition: Optional[str],
+) -> List[Tuple[str, str]]:
     params: List[Tuple[str, str]] = []
     _add(params, "format", DEFAULT_FORMAT)
 
@@ -267,22 +291,62 @@ async def gaps_search(
     _add(params, "study.factor value.spaceflight")
     _add(params, "study.characteristics")  # para intentar capturar tissue
 
-    # Ejecutar
-    rows = await _fetch_json_records(ASSAYS_BASE, params)
+    return params
 
-    # Para devolver la URL aplicada (debug/visibilidad)
-    async with httpx.AsyncClient() as c:
-        applied_url = str(c.build_request("GET", ASSAYS_BASE, params=params).url)
+# ----------------- /gaps/search (GET: ahora SOLO q) -----------------
 
-    if not rows:
-        return {"applied_url": applied_url, "highlights": [], "gaps_total": 0, "gaps": []}
+@router.get("/gaps/search")
+async def gaps_search(
+    request: Request,
+    q: Optional[str] = Query(None, description="Consulta libre; la IA la convierte a organisms/assays/condition/tissues"),
+    min_datasets_for_covered: int = Query(1, ge=1, description="Umbral datasets para covered"),
+    top_n: int = Query(20, ge=1, le=100, description="Número de gaps destacados (rankeados) a devolver"),
+    page_size: Optional[int] = Query(None, ge=1, le=1000, description="Gaps por página (sin él, la lista completa)"),
+    cursor: Optional[str] = Query(None, description="Cursor `next_cursor` de la página anterior; ignora el resto de filtros"),
+):
+    """
+    Igual que tu endpoint actual, pero la UI solo manda `q`.
+    Por dentro, se mapea con IA a organisms/assays/condition/tissues y se reusa tu lógica tal cual.
+    Con `page_size` la lista de gaps se pagina: las páginas siguientes (`cursor`) salen del
+    resultado guardado unos minutos en el servidor, sin repetir IA ni consulta a OSDR.
+    Los gaps y su orden dependen de todas las combinaciones observadas, así que la lista
+    se calcula entera antes de la primera página: se acota el tamaño de la respuesta, no
+    el tiempo de cálculo.
+    """
+    if cursor:
+        try:
+            result, page, next_cursor = _results.next_page(cursor, page_size)
+        except CursorError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        return {**result.meta, "gaps": page, "next_cursor": next_cursor}
+
+    # ⬇️ 1) IA → filtros (fuera del loop); mientras tanto se descarga de OSDR un superconjunto probable
+    prefetch = start_prefetch(request, q, characteristics=True, require_spaceflight=True)
+    try:
+        organisms, assays, condition, tissues = await asyncio.to_thread(_nl_to_filters, request, q)
+    except BaseException:
+        if prefetch is not None:
+            prefetch.cancel()
+        raise
+
+    # 2) Construir params para /v2/query/assays/ (igual que tu flujo)
+    params = _build_gap_params(organisms, assays, condition)
 
-    # 3) Normalizar y construir observados (sin tocar tu lógica)
+    # Para devolver la URL aplicada (debug/visibilidad)
+    url = applied_url(ASSAYS_BASE, params)
+
+    # 3) Ejecutar, normalizando cada fila en observados según llega (sin tocar tu lógica)
     observed = []
     tissues_observed: Set[Optional[str]] = set()
     assay_freq_global = Counter()
+    rows_seen = 0
 
-    for row in rows:
+    rows = _iter_json_records(
+        get_osdr(request), get_catalog(request), ASSAYS_BASE, params,
+        prefetch=prefetch, organisms_universe=known_organisms(request.app.state),
+    )
+    async for row in rows:
+        rows_seen += 1
         organism = _norm_str(row.get("study.characteristics.organism"))
         assay_type = _norm_str(row.get("investigation.study assays.study assay technology type"))
         cond_norm = _norm_condition(row.get("study.factor value.spaceflight")) or "Unknown"
@@ -298,6 +362,9 @@ async def gaps_search(
             observed.append((organism, tissue, cond_norm, assay_type, accession, assay_name, cond_coarse))
             assay_freq_global[assay_type] += 1
 
+    if not rows_seen:
+        return {"applied_url": url, "highlights": [], "gaps_total": 0, "gaps": [], "next_cursor": None}
+
     # Filtrar por condición si procede (ya filtramos arriba, pero por si entran variantes)
     if condition in {"Spaceflight", "Ground/Analog"}:
         observed = [t for t in observed if t[6] == condition]
@@ -569,9 +636,11 @@ async def gaps_search(
     coverage_rows.sort(key=lambda r: (r["organism"] or "", r["tissue"] or "", r["condition"] or "", r["assay_type"] or ""))
     gaps.sort(key=lambda r: (r["organism"] or "", r["tissue"] or "", r["condition"] or "", r["assay_type"] or ""))
 
+    page, next_cursor = _results.first_page(gaps, page_size, meta={"applied_url": url, "gaps_total": len(gaps)})
     return {
-        "applied_url": applied_url,
+        "applied_url": url,
         "highlights": highlights_top,
         "gaps_total": len(gaps),
-        "gaps": gaps,
+        "gaps": page,
+        "next_cursor": next_cursor,
     }
@@ -0,0 +1,107 @@
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Hashable, Protocol
+
+
+def normalize_query(text: str) -> str:
+    """Forma canónica de la pregunta: minúsculas, espacios colapsados y sin puntuación final."""
+    s = unicodedata.normalize("NFKC", text).lower()
+    s = " ".join(s.split())
+    return re.sub(r"[\s?¿!¡.,;:]+$", "", s).lstrip("¿¡ ")
+
+
+class IndexVersionSource(Protocol):
+    def get(self) -> str: ...
+
+
+class IndexFingerprint:
+    """
+    Huella de los parquet bajo `root` (ruta, tamaño y mtime).
+
+    Cambia en cuanto se re-indexa, así que sirve de versión del índice en las claves
+    de caché. Se recalcula como mucho cada `refresh_seconds` para no recorrer el
+    disco en cada consulta.
+    """
+
+    def __init__(self, root: Path, refresh_seconds: float = 10.0):
+        self.root = Path(root)
+        self.refresh_seconds = refresh_seconds
+        self._value = ""
+        self._computed_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def get(self) -> str:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._computed_at >= self.refresh_seconds:
+                self._value = self.compute(self.root)
+                self._computed_at = now
+            return self._value
+
+    @staticmethod
+    def compute(root: Path) -> str:
+        digest = hashlib.sha1()
+        for path in sorted(Path(root).rglob("*.parquet")):
+            stat = path.stat()
+            digest.update(f"{path.relative_to(root)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        return digest.hexdigest()
+
+
+class AnswerCache:
+    """Caché LRU con TTL para respuestas del chatbot."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float | None = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, answer = entry
+            if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return answer
+
+    def put(self, key: Hashable, answer: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
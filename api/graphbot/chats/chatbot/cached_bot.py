@@ -0,0 +1,118 @@
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from .answer_cache import AnswerCache, IndexVersionSource, normalize_query
+from .chatbot import ChatBot
+from .chatbot_message import ChatBotAnswer, ChatBotMessage
+from .semantic_cache import SemanticAnswerCache
+from ..models import SourceRefs
+
+logger = logging.getLogger(__name__)
+
+QueryEmbedder = Callable[[str], Awaitable[list[float]]]
+
+
+class CachedBot(ChatBot):
+    """
+    Envuelve otro ChatBot con una caché de respuestas.
+
+    La clave es (método, pregunta normalizada, huella del índice); el historial no
+    entra porque las búsquedas de GraphRAG no lo usan. Si se configura un segundo
+    nivel semántico, una pregunta parafraseada reutiliza la respuesta de otra cercana.
+    """
+
+    def __init__(
+        self,
+        inner: ChatBot,
+        cache: AnswerCache,
+        fingerprint: IndexVersionSource,
+        semantic_cache: SemanticAnswerCache | None = None,
+        embed: QueryEmbedder | None = None,
+    ):
+        self.inner = inner
+        self.cache = cache
+        self.fingerprint = fingerprint
+        self.semantic_cache = semantic_cache if embed is not None else None
+        self.embed = embed
+
+    def resolve_method(self, user_input: str, method: str) -> str:
+        return self.inner.resolve_method(user_input, method)
+
+    def cache_key(self, user_input: str, method: str) -> tuple[str, str, str]:
+        return (method, normalize_query(user_input), self.fingerprint.get())
+
+    async def reply(self, user_input: str, chat_history: list[ChatBotMessage], method: str) -> ChatBotAnswer:
+        method = self.resolve_method(user_input, method)
+        key = self.cache_key(user_input, method)
+        answer, vector = await self._lookup(key)
+        if answer is not None:
+            return answer
+
+        answer = await self.inner.reply(user_input, chat_history, method)
+        self._store(key, vector, answer)
+        return answer
+
+    async def stream_reply(
+        self,
+        user_input: str,
+        chat_history: list[ChatBotMessage],
+        method: str,
+    ) -> AsyncIterator[str | SourceRefs]:
+        method = self.resolve_method(user_input, method)
+        key = self.cache_key(user_input, method)
+        answer, vector = await self._lookup(key)
+        if answer is not None:
+            yield answer.content
+            if answer.sources is not None:
+                yield answer.sources
+            return
+
+        chunks: list[str] = []
+        sources = None
+        async for chunk in self.inner.stream_reply(user_input, chat_history, method):
+            if isinstance(chunk, SourceRefs):
+                sources = chunk
+            else:
+                chunks.append(chunk)
+            yield chunk
+
+        self._store(key, vector, ChatBotAnswer("".join(chunks), sources))
+
+    async def warm_up(self, query: str) -> None:
+        # Huella y cliente de embeddings listos; la respuesta sintética no se guarda
+        self.fingerprint.get()
+        if self.semantic_cache is not None:
+            await self.embed(normalize_query(query))
+        await self.inner.warm_up(query)
+
+    def stats(self) -> dict[str, Any]:
+        stats = {**self.inner.stats(), "answer_cache": self.cache.stats()}
+        if self.semantic_cache is not None:
+            stats["semantic_cache"] = self.semantic_cache.stats()
+        return stats
+
+    def close(self) -> None:
+        self.inner.close()
+
+    async def _lookup(self, key: tuple[str, str, str]) -> tuple[ChatBotAnswer | None, list[float] | None]:
+        answer = self.cache.get(key)
+        if answer is not None or self.semantic_cache is None:
+            return answer, None
+
+        method, query, fingerprint = key
+        try:
+            vector = await self.embed(query)
+        except Exception as e:
+            logger.warning("Could not embed query for the semantic cache: %s", e)
+            return None, None
+
+        answer = self.semantic_cache.get((method, fingerprint), vector)
+        if answer is not None:
+            self.cache.put(key, answer)
+        return answer, vector
+
+    def _store(self, key: tuple[str, str, str], vector: list[float] | None, answer: ChatBotAnswer) -> None:
+        self.cache.put(key, answer)
+        if self.semantic_cache is not None and vector:
+            method, _query, fingerprint = key
+            self.semantic_cache.put((method, fingerprint), vector, answer)
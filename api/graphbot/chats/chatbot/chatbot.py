@@ -1,9 +1,41 @@
 from abc import ABC, abstractmethod
-from .chatbot_message import ChatBotMessage
+from typing import Any, AsyncIterator
+
+from .chatbot_message import ChatBotAnswer, ChatBotMessage
+from ..models import SourceRefs
+
+INVALID_METHOD_ERROR = "Invalid method"
 
 
 class ChatBot(ABC):
 
     @abstractmethod
-    async def reply(self, user_input: str, chat_history: list[ChatBotMessage], method: str) -> str:
+    async def reply(self, user_input: str, chat_history: list[ChatBotMessage], method: str) -> ChatBotAnswer:
+        pass
+
+    async def stream_reply(
+        self,
+        user_input: str,
+        chat_history: list[ChatBotMessage],
+        method: str,
+    ) -> AsyncIterator[str | SourceRefs]:
+        # Fragmentos de texto y, como último elemento opcional, las fuentes de la respuesta.
+        # Por defecto, los bots sin streaming devuelven la respuesta completa como un único fragmento
+        answer = await self.reply(user_input, chat_history, method)
+        yield answer.content
+        if answer.sources is not None:
+            yield answer.sources
+
+    def resolve_method(self, user_input: str, method: str) -> str:
+        # Traduce métodos "virtuales" (p. ej. `auto`) al método concreto que se ejecutará
+        return method
+
+    async def warm_up(self, query: str) -> None:
+        # Precalienta lo que haga falta (conexiones, índices...) antes de recibir tráfico
+        pass
+
+    def stats(self) -> dict[str, Any]:
+        return {}
+
+    def close(self) -> None:
         pass
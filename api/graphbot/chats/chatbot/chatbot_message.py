@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from typing import List
 
-from ..models import ChatMessage, ROLE
+from ..models import ChatMessage, ROLE, SourceRefs
 
 
 @dataclass(frozen=True)
@@ -9,5 +9,10 @@ class ChatBotMessage:
     role: str
     content: str
 
+@dataclass(frozen=True)
+class ChatBotAnswer:
+    content: str
+    sources: SourceRefs | None = None
+
 def to_chatbot_messages(messages: List[ChatMessage]) -> List[ChatBotMessage]:
     return [ChatBotMessage(role=m.role.value, content=m.content) for m in messages]
@@ -1,8 +1,8 @@
 from .chatbot import ChatBot
-from .chatbot_message import ChatBotMessage
+from .chatbot_message import ChatBotAnswer, ChatBotMessage
 
 
 class DummyBot(ChatBot):
 
-    async def reply(self, user_input: str, chat_history: list[ChatBotMessage], method: str) -> str:
-        return user_input[::-1]
+    async def reply(self, user_input: str, chat_history: list[ChatBotMessage], method: str) -> ChatBotAnswer:
+        return ChatBotAnswer(user_input[::-1])
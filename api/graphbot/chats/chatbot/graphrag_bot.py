@@ -1,67 +1,100 @@
 import asyncio
-from pathlib import Path
-
-from graphrag.cli.query import run_drift_search, run_global_search, run_local_search
-from graphrag.cli.main import SearchType
+from dataclasses import replace
+from typing import Any, AsyncIterator
 
 from .chatbot import ChatBot
-from .chatbot_message import ChatBotMessage
-from ...settings import settings
+from .chatbot_message import ChatBotAnswer, ChatBotMessage
+from . import graphrag_worker
+from .graphrag_engine import source_refs
+from .index_holder import IndexHolder
+from .method_router import AUTO_METHOD
+from .search_scheduler import SearchScheduler
+from ..models import SourceRefs
 
-INVALID_METHOD_ERROR = "Invalid method"
 
 class GraphRAGBot(ChatBot):
 
+    def __init__(self, index: IndexHolder, scheduler: SearchScheduler):
+        # Cada versión del índice trae un engine residente o, en modo proceso, su propio
+        # pool de workers (cada uno con su copia del índice).
+        self.index = index
+        self.scheduler = scheduler
+        self.routed: dict[str, int] = {}
+
+    def resolve_method(self, user_input: str, method: str) -> str:
+        router = self.index.current.router
+        if method != AUTO_METHOD or router is None:
+            return method
+
+        decision = router.route(user_input)
+        self.routed[decision.method] = self.routed.get(decision.method, 0) + 1
+        return decision.method
+
     async def reply(
         self,
         user_input: str,
         chat_history: list[ChatBotMessage],
         method: str,
-        config: Path | None = None,
-    ) -> str:
-        # Ejecutamos la búsqueda sin bloquear el loop actual porque
-        # las funciones `run_*_search` usan `asyncio.run` internamente.
-        return await asyncio.to_thread(
-            self._run_search,
-            user_input,
-            chat_history,
-            method,
-            config,
-        )
+    ) -> ChatBotAnswer:
+        method = self.resolve_method(user_input, method)
+
+        async with self.scheduler.slot(method):
+            # La versión se fija al empezar: un cambio de índice no corta esta consulta
+            with self.index.acquire() as version:
+                if version.engine is None:
+                    loop = asyncio.get_running_loop()
+                    response, refs = await loop.run_in_executor(
+                        version.pool, graphrag_worker.run_search, method, user_input,
+                    )
+                else:
+                    # La búsqueda corre en el loop del servidor; sólo la parte síncrona y pesada
+                    # (construcción de contexto) va al pool acotado del scheduler.
+                    response, context_data = await version.engine.asearch(
+                        method,
+                        user_input,
+                        offload=self.scheduler.run_in_executor,
+                    )
+                    refs = source_refs(context_data)
 
-    def _run_search(
+                # Las referencias sólo tienen sentido con la versión del índice que las produjo
+                return ChatBotAnswer(response, replace(refs, version=version.version))
+
+    async def stream_reply(
         self,
         user_input: str,
         chat_history: list[ChatBotMessage],
         method: str,
-        config: Path | None,
-    ) -> str:
-        match method:
-            case SearchType.LOCAL.value:
-                response, _context_data = run_local_search(
-                    config_filepath=config,
-                    data_dir=None,
-                    root_dir=settings.graphrag_root,
-                    streaming=False,
-                    community_level=2,
-                    response_type="Multiple Paragraphs",
-                    query=user_input,
-                )
-            case SearchType.GLOBAL.value:
-                response, _context_data = run_global_search(
-                    config_filepath=config,
-                    root_dir=settings.graphrag_root,
-                    streaming=False,
-                    query=user_input,
-                )
-            case SearchType.DRIFT.value:
-                response, _context_data = run_drift_search(
-                    config_filepath=config,
-                    root_dir=settings.graphrag_root,
-                    streaming=False,  # Drift search does not support streaming (yet)
-                    query=user_input,
-                )
-            case _:
-                raise ValueError(INVALID_METHOD_ERROR)
+    ) -> AsyncIterator[str | SourceRefs]:
+        method = self.resolve_method(user_input, method)
+        if self.index.current.engine is None:
+            # Los tokens no cruzan la frontera de proceso: respuesta completa de una vez
+            answer = await self.reply(user_input, chat_history, method)
+            yield answer.content
+            yield answer.sources
+            return
+
+        async with self.scheduler.slot(method):
+            with self.index.acquire() as version:
+                async for chunk in version.engine.astream_search(
+                    method,
+                    user_input,
+                    offload=self.scheduler.run_in_executor,
+                ):
+                    if isinstance(chunk, SourceRefs):
+                        chunk = replace(chunk, version=version.version)
+                    yield chunk
+
+    async def warm_up(self, query: str) -> None:
+        # Una búsqueda local real: abre las conexiones al LLM y toca el vector store
+        await self.reply(query, [], "local")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "scheduler": self.scheduler.stats(),
+            "auto_routing": dict(self.routed),
+            "index": self.index.stats(),
+        }
 
-        return response
+    def close(self) -> None:
+        self.index.close()
+        self.scheduler.shutdown()
@@ -0,0 +1,330 @@
+import asyncio
+import copy
+from functools import partial
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+import pandas as pd
+
+from graphrag.cli.main import SearchType
+from graphrag.config.load_config import load_config
+from graphrag.config.resolve_path import resolve_paths
+from graphrag.index.config.embeddings import (
+    community_full_content_embedding,
+    entity_description_embedding,
+)
+from graphrag.query.factory import (
+    get_global_search_engine,
+    get_local_search_engine,
+)
+from graphrag.query.indexer_adapters import (
+    read_indexer_communities,
+    read_indexer_covariates,
+    read_indexer_entities,
+    read_indexer_relationships,
+    read_indexer_report_embeddings,
+    read_indexer_reports,
+    read_indexer_text_units,
+)
+from graphrag.query.structured_search.drift_search.drift_context import DRIFTSearchContextBuilder
+from graphrag.query.structured_search.drift_search.search import DRIFTSearch
+from graphrag.query.structured_search.drift_search.state import QueryState
+from graphrag.utils.embeddings import create_collection_name
+from graphrag.vector_stores.base import BaseVectorStore
+from graphrag.vector_stores.factory import VectorStoreFactory
+
+from .chatbot import INVALID_METHOD_ERROR
+from ..models import SourceRefs
+
+# Ejecuta una función síncrona fuera del event loop (asyncio.to_thread, un executor...)
+Offload = Callable[..., Awaitable[Any]]
+
+OUTPUT_TABLES = [
+    "create_final_nodes",
+    "create_final_entities",
+    "create_final_communities",
+    "create_final_community_reports",
+    "create_final_text_units",
+    "create_final_relationships",
+]
+OPTIONAL_TABLES = [
+    "create_final_covariates",
+]
+
+
+class GraphRAGEngine:
+    """
+    Índice de GraphRAG residente en memoria.
+
+    Lee la configuración, los parquet de `output/`, los vector stores y los prompts
+    una sola vez; cada consulta trabaja sólo sobre los objetos ya cargados.
+    """
+
+    def __init__(
+        self,
+        root_dir: Path,
+        config_filepath: Path | None = None,
+        community_level: int = 2,
+        response_type: str = "Multiple Paragraphs",
+    ):
+        self.root_dir = Path(root_dir).resolve()
+        self.config = load_config(self.root_dir, config_filepath)
+        resolve_paths(self.config)
+        self.output_dir = Path(self.config.storage.base_dir)
+
+        self.community_level = community_level
+        self.response_type = response_type
+
+        self.tables = self._load_tables(self.output_dir)
+        nodes = self.tables["create_final_nodes"]
+        community_reports = self.tables["create_final_community_reports"]
+        covariates = self.tables["create_final_covariates"]
+
+        self.entities = read_indexer_entities(nodes, self.tables["create_final_entities"], community_level)
+        self.reports = read_indexer_reports(community_reports, nodes, community_level)
+        self.communities = read_indexer_communities(self.tables["create_final_communities"], nodes, community_reports)
+        self.text_units = read_indexer_text_units(self.tables["create_final_text_units"])
+        self.relationships = read_indexer_relationships(self.tables["create_final_relationships"])
+        self.covariates = read_indexer_covariates(covariates) if covariates is not None else []
+
+        vector_store_args = self.config.embeddings.vector_store
+        self.description_embedding_store = self._get_embedding_store(vector_store_args, entity_description_embedding)
+        full_content_embedding_store = self._get_embedding_store(vector_store_args, community_full_content_embedding)
+        read_indexer_report_embeddings(self.reports, full_content_embedding_store)
+
+        self.local_prompt = self._load_prompt(self.config.local_search.prompt)
+        self.map_prompt = self._load_prompt(self.config.global_search.map_prompt)
+        self.reduce_prompt = self._load_prompt(self.config.global_search.reduce_prompt)
+        self.knowledge_prompt = self._load_prompt(self.config.global_search.knowledge_prompt)
+        self.drift_prompt = self._load_prompt(self.config.drift_search.prompt)
+
+        # Motores residentes que comparten un mismo cliente LLM (y su pool de conexiones);
+        # se usan siempre desde el event loop del servidor.
+        self.local_search = self._local_search_engine()
+        self.global_search = self._global_search_engine()
+        self.llm = self.local_search.llm
+        self.global_search.llm = self.llm
+        self.drift_search = self._drift_search_engine()
+
+    async def asearch(self, method: str, query: str, offload: Offload = asyncio.to_thread) -> tuple[str, dict[str, Any]]:
+        match method:
+            case SearchType.LOCAL.value:
+                search_engine = await self._prepared_local_search(query, offload)
+                result = await search_engine.asearch(query=query)
+            case SearchType.GLOBAL.value:
+                result = await self.global_search.asearch(query=query)
+            case SearchType.DRIFT.value:
+                result = await self._drift(query, offload)
+            case _:
+                raise ValueError(INVALID_METHOD_ERROR)
+
+        response = result.response
+        # DRIFT devuelve el estado completo; nos quedamos con la respuesta mejor puntuada
+        if isinstance(response, dict):
+            response = response["nodes"][0]["answer"]
+
+        return response, _reformat_context_data(result.context_data)
+
+    async def astream_search(
+        self,
+        method: str,
+        query: str,
+        offload: Offload = asyncio.to_thread,
+    ) -> AsyncIterator[str | SourceRefs]:
+        """Tokens de la respuesta y, al final, las referencias del contexto usado."""
+        match method:
+            case SearchType.LOCAL.value:
+                search_engine = await self._prepared_local_search(query, offload)
+            case SearchType.GLOBAL.value:
+                search_engine = self.global_search
+            case SearchType.DRIFT.value:
+                # DRIFT no soporta streaming (todavía): devolvemos la respuesta de una vez
+                response, context_data = await self.asearch(method, query, offload)
+                yield response
+                yield source_refs(context_data)
+                return
+            case _:
+                raise ValueError(INVALID_METHOD_ERROR)
+
+        # El primer elemento del stream es el context data; el resto son tokens
+        context_data = None
+        async for stream_chunk in search_engine.astream_search(query=query):
+            if context_data is None:
+                context_data = stream_chunk
+                continue
+            yield stream_chunk
+
+        yield source_refs(_reformat_context_data(context_data or {}))
+
+    async def _prepared_local_search(self, query: str, offload: Offload, local_search=None, **kwargs):
+        # build_context es síncrono y pesado (pandas + similitud de embeddings): se hace
+        # fuera del loop y la llamada al LLM sí corre en el loop con el cliente compartido.
+        local_search = local_search or self.local_search
+        context_result = await offload(partial(
+            local_search.context_builder.build_context,
+            query=query,
+            **kwargs,
+            **local_search.context_builder_params,
+        ))
+        search_engine = copy.copy(local_search)
+        search_engine.context_builder = _PrebuiltContext(context_result)
+        return search_engine
+
+    async def _drift(self, query: str, offload: Offload):
+        # Mismo motor residente para todas las consultas; cada una con su propio estado.
+        # Las partes síncronas (primer y contexto de cada acción) van fuera del loop.
+        drift = copy.copy(self.drift_search)
+        drift.query_state = QueryState()
+        primer_context = await offload(drift.context_builder.build_context, query)
+        drift.context_builder = _PrebuiltContext(primer_context)
+        drift.local_search = _OffloadedLocalSearch(self, self.drift_search.local_search, offload)
+        return await drift.asearch(query=query)
+
+    def _local_search_engine(self):
+        return get_local_search_engine(
+            config=self.config,
+            reports=self.reports,
+            text_units=self.text_units,
+            entities=self.entities,
+            relationships=self.relationships,
+            covariates={"claims": self.covariates},
+            description_embedding_store=self.description_embedding_store,
+            response_type=self.response_type,
+            system_prompt=self.local_prompt,
+        )
+
+    def _global_search_engine(self):
+        return get_global_search_engine(
+            self.config,
+            reports=self.reports,
+            entities=self.entities,
+            communities=self.communities,
+            response_type=self.response_type,
+            map_system_prompt=self.map_prompt,
+            reduce_system_prompt=self.reduce_prompt,
+            general_knowledge_inclusion_prompt=self.knowledge_prompt,
+        )
+
+    def _drift_search_engine(self):
+        # Como get_drift_search_engine, pero sobre el cliente LLM, el embedder y el
+        # tokenizer que ya usa la búsqueda local
+        local_context = self.local_search.context_builder
+        return DRIFTSearch(
+            llm=self.llm,
+            context_builder=DRIFTSearchContextBuilder(
+                chat_llm=self.llm,
+                text_embedder=local_context.text_embedder,
+                entities=self.entities,
+                relationships=self.relationships,
+                reports=self.reports,
+                entity_text_embeddings=self.description_embedding_store,
+                text_units=self.text_units,
+                local_system_prompt=self.drift_prompt,
+                config=self.config.drift_search,
+            ),
+            token_encoder=self.local_search.token_encoder,
+        )
+
+    @staticmethod
+    def _load_tables(output_dir: Path) -> dict[str, pd.DataFrame | None]:
+        tables: dict[str, pd.DataFrame | None] = {}
+        for name in OUTPUT_TABLES:
+            tables[name] = pd.read_parquet(output_dir / f"{name}.parquet")
+
+        for name in OPTIONAL_TABLES:
+            path = output_dir / f"{name}.parquet"
+            tables[name] = pd.read_parquet(path) if path.exists() else None
+
+        return tables
+
+    @staticmethod
+    def _get_embedding_store(config_args: dict, embedding_name: str) -> BaseVectorStore:
+        collection_name = create_collection_name(config_args.get("container_name", "default"), embedding_name)
+        embedding_store = VectorStoreFactory().create_vector_store(
+            vector_store_type=config_args["type"],
+            kwargs={**config_args, "collection_name": collection_name},
+        )
+        embedding_store.connect(**config_args)
+        return embedding_store
+
+    def _load_prompt(self, prompt_config: str | None) -> str | None:
+        if prompt_config:
+            prompt_file = Path(self.config.root_dir) / prompt_config
+            if prompt_file.exists():
+                return prompt_file.read_text(encoding="utf-8")
+        return None
+
+
+def resolve_output_dir(root_dir: Path, config_filepath: Path | None = None) -> Path:
+    """Carpeta con los parquet del índice, sin cargar nada más."""
+    config = load_config(Path(root_dir).resolve(), config_filepath)
+    resolve_paths(config)
+    return Path(config.storage.base_dir)
+
+
+class _PrebuiltContext:
+    """Context builder que devuelve un contexto ya construido."""
+
+    def __init__(self, context_result):
+        self.context_result = context_result
+
+    def build_context(self, *args, **kwargs):
+        return self.context_result
+
+
+class _OffloadedLocalSearch:
+    """Búsqueda local de cada acción de DRIFT con el contexto construido fuera del loop."""
+
+    def __init__(self, engine: GraphRAGEngine, local_search, offload: Offload):
+        self.engine = engine
+        self.local_search = local_search
+        self.offload = offload
+
+    async def asearch(self, query: str, **kwargs):
+        search_engine = await self.engine._prepared_local_search(query, self.offload, self.local_search, **kwargs)
+        return await search_engine.asearch(query=query, **kwargs)
+
+
+def _reformat_context_data(context_data: dict) -> dict[str, list]:
+    final_format: dict[str, list] = {
+        "reports": [],
+        "entities": [],
+        "relationships": [],
+        "claims": [],
+        "sources": [],
+    }
+    for key, value in context_data.items():
+        records = (
+            value.to_dict(orient="records")
+            if value is not None and not isinstance(value, dict)
+            else value
+        )
+        if not records:
+            continue
+        final_format[key] = records
+    return final_format
+
+
+def source_refs(context_data: dict[str, list]) -> SourceRefs:
+    """Ids cortos (human_readable_id / comunidad) de lo que entró en el contexto."""
+
+    def ids(key: str) -> tuple[int, ...]:
+        records = context_data.get(key) or []
+        if not isinstance(records, list):
+            return ()
+        found = []
+        for record in records:
+            # La búsqueda local marca con in_context=False los candidatos que no cupieron
+            if isinstance(record, dict) and record.get("in_context", True) is not False:
+                try:
+                    found.append(int(record["id"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+        return tuple(dict.fromkeys(found))
+
+    return SourceRefs(
+        entities=ids("entities"),
+        relationships=ids("relationships"),
+        reports=ids("reports"),
+        text_units=ids("sources"),
+    )
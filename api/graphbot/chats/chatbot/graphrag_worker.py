@@ -0,0 +1,53 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .graphrag_engine import GraphRAGEngine, source_refs
+from ..models import SourceRefs
+
+# Índice residente del proceso worker (se carga una vez en el initializer) y el loop
+# en el que se usan siempre sus clientes LLM
+_engine: GraphRAGEngine | None = None
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def init_worker(root_dir: Path, config_filepath: Path | None, community_level: int) -> None:
+    global _engine, _loop
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+    _engine = GraphRAGEngine(root_dir, config_filepath=config_filepath, community_level=community_level)
+
+
+def ping() -> int:
+    return os.getpid()
+
+
+def run_search(method: str, query: str) -> tuple[str, SourceRefs]:
+    response, context_data = _loop.run_until_complete(_engine.asearch(method, query))
+    # Sólo las referencias compactas cruzan la frontera de proceso
+    return response, source_refs(context_data)
+
+
+def make_process_pool(
+    root_dir: Path,
+    config_filepath: Path | None,
+    community_level: int,
+    processes: int | None = None,
+) -> ProcessPoolExecutor:
+    processes = processes or os.cpu_count() or 1
+
+    # "spawn" para no heredar los hilos del servidor al hacer fork
+    pool = ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(root_dir, config_filepath, community_level),
+    )
+
+    # Arrancamos todos los workers ya (cada uno carga su índice mientras tanto)
+    for _ in range(processes):
+        pool.submit(ping)
+
+    return pool
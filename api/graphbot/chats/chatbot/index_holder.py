@@ -0,0 +1,167 @@
+import gc
+import logging
+import threading
+import time
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from .answer_cache import IndexFingerprint
+from .graphrag_engine import GraphRAGEngine
+from .method_router import MethodRouter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IndexVersion:
+    """Una versión cargada del índice: engine residente o pool de workers, más su router."""
+
+    version: str = ""
+    router: MethodRouter | None = None
+    engine: GraphRAGEngine | None = None
+    pool: Executor | None = None
+    loaded_at: float = field(default_factory=time.time)
+    in_flight: int = 0
+    retired: bool = False
+
+    def release(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        self.engine = None
+        self.pool = None
+        self.router = None
+
+
+class IndexHolder:
+    """
+    Índice de GraphRAG versionado con recarga en caliente.
+
+    Un hilo vigila la huella de los parquet de `output_dir`; cuando cambia y se queda
+    estable durante dos sondeos seguidos (el indexador ya terminó de escribir), carga
+    la nueva versión en segundo plano y la publica de forma atómica. Las consultas en
+    curso terminan sobre la versión que adquirieron y la anterior se libera cuando
+    se vacía.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], IndexVersion],
+        output_dir: Path,
+        poll_seconds: float = 30.0,
+    ):
+        self.loader = loader
+        self.output_dir = Path(output_dir)
+        self.poll_seconds = poll_seconds
+
+        self._lock = threading.Lock()
+        self._current = self._load()
+        self._retired: list[IndexVersion] = []
+        self.swaps = 0
+        self.last_error: str | None = None
+
+        self._stop = threading.Event()
+        self._watcher: threading.Thread | None = None
+        if poll_seconds > 0:
+            self._watcher = threading.Thread(target=self._watch, name="graphrag-index-watcher", daemon=True)
+            self._watcher.start()
+
+    @property
+    def current(self) -> IndexVersion:
+        return self._current
+
+    def get(self) -> str:
+        # Versión publicada; sirve de huella en las claves de la caché de respuestas
+        return self._current.version
+
+    @contextmanager
+    def acquire(self) -> Iterator[IndexVersion]:
+        with self._lock:
+            version = self._current
+            version.in_flight += 1
+        try:
+            yield version
+        finally:
+            with self._lock:
+                version.in_flight -= 1
+                drained = version.retired and version.in_flight == 0
+                if drained:
+                    self._retired.remove(version)
+            if drained:
+                self._release(version)
+
+    def reload(self) -> IndexVersion:
+        new_version = self._load()
+        with self._lock:
+            old_version = self._current
+            self._current = new_version
+            old_version.retired = True
+            drained = old_version.in_flight == 0
+            if not drained:
+                self._retired.append(old_version)
+            self.swaps += 1
+
+        logger.info("GraphRAG index swapped: %s -> %s", old_version.version[:12], new_version.version[:12])
+        if drained:
+            self._release(old_version)
+        return new_version
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "version": self._current.version,
+                "loaded_at": self._current.loaded_at,
+                "in_flight": self._current.in_flight,
+                "draining": [{"version": v.version, "in_flight": v.in_flight} for v in self._retired],
+                "swaps": self.swaps,
+                "last_error": self.last_error,
+            }
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.poll_seconds)
+        with self._lock:
+            versions = [self._current, *self._retired]
+            self._retired.clear()
+        for version in versions:
+            version.release()
+
+    def _load(self) -> IndexVersion:
+        # La huella se toma antes de leer: si cambia durante la carga, el siguiente sondeo lo detecta
+        fingerprint = IndexFingerprint.compute(self.output_dir)
+        start = time.perf_counter()
+        version = self.loader()
+        version.version = fingerprint
+        logger.info("GraphRAG index %s loaded in %.1f s", fingerprint[:12], time.perf_counter() - start)
+        return version
+
+    def _release(self, version: IndexVersion) -> None:
+        version.release()
+        gc.collect()
+        logger.info("GraphRAG index %s released", version.version[:12])
+
+    def _watch(self) -> None:
+        pending: str | None = None
+        failed: str | None = None
+        while not self._stop.wait(self.poll_seconds):
+            fingerprint = None
+            try:
+                fingerprint = IndexFingerprint.compute(self.output_dir)
+                if fingerprint in (self._current.version, failed):
+                    pending = None
+                elif fingerprint != pending:
+                    # Cambio recién visto: esperamos a que deje de moverse
+                    pending = fingerprint
+                else:
+                    self.reload()
+                    self.last_error = None
+                    pending = None
+            except Exception as e:
+                # Un índice a medio escribir o roto no tumba el servicio: seguimos con el actual
+                self.last_error = str(e)
+                failed = fingerprint
+                pending = None
+                logger.exception("Could not reload the GraphRAG index")
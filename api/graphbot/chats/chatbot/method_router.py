@@ -0,0 +1,135 @@
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+AUTO_METHOD = "auto"
+
+# Preguntas de visión general: se responden mejor con los informes de comunidad (global)
+GLOBAL_CUES = (
+    "overall", "overview", "in general", "summarize", "summarise", "summary",
+    "main themes", "key themes", "main topics", "main findings", "key findings",
+    "trends", "across all", "big picture", "what is known",
+    "en general", "resumen", "resumir", "temas principales",
+    "principales hallazgos", "tendencias", "panorama", "visión general",
+)
+
+# Comparaciones explícitas entre entidades: lo único que justifica el coste de DRIFT.
+# "How does X affect Y" y similares nombran entidades concretas y van a local.
+COMPARISON_CUES = (
+    "compare", "comparison", "difference between", "differences between", "versus", " vs ",
+    "compara", "diferencia entre", "diferencias entre", "frente a",
+)
+
+_TOKEN_RE = re.compile(r"[\w/+-]+")
+
+
+def _tokens(text: str) -> list[str]:
+    text = unicodedata.normalize("NFKC", text).lower()
+    return _TOKEN_RE.findall(text)
+
+
+@dataclass
+class RouteDecision:
+    method: str
+    reason: str
+    entities: list[str] = field(default_factory=list)
+
+
+class MethodRouter:
+    """
+    Elige local, global o drift para el método `auto` sin llamar al LLM.
+
+    Busca en la pregunta los títulos de `create_final_entities` (n-gramas de tokens
+    contra un set) y combina los aciertos con unas pocas pistas léxicas. Las entidades
+    de grado muy alto (SPACEFLIGHT, NASA...) aparecen en casi cualquier pregunta, así
+    que cuentan como genéricas y no fuerzan una búsqueda local.
+    """
+
+    def __init__(
+        self,
+        entity_titles: Iterable[str],
+        generic_titles: Iterable[str] = (),
+        max_ngram: int = 8,
+    ):
+        self._titles: set[tuple[str, ...]] = set()
+        for title in entity_titles:
+            tokens = tuple(_tokens(str(title)))
+            # Títulos de un solo carácter o número generan falsos positivos
+            if tokens and len(" ".join(tokens)) > 2:
+                self._titles.add(tokens)
+
+        self._generic = {tuple(_tokens(str(title))) for title in generic_titles}
+        self.max_ngram = min(max_ngram, max((len(t) for t in self._titles), default=1))
+
+    @classmethod
+    def from_tables(
+        cls,
+        entities: pd.DataFrame,
+        nodes: pd.DataFrame | None = None,
+        generic_quantile: float = 0.98,
+    ) -> "MethodRouter":
+        generic: list[str] = []
+        if nodes is not None and len(nodes):
+            degrees = nodes.drop_duplicates("title")[["title", "degree"]]
+            cutoff = np.quantile(degrees["degree"].to_numpy(), generic_quantile)
+            generic = degrees.loc[degrees["degree"] >= cutoff, "title"].tolist()
+
+        return cls(entities["title"].dropna().tolist(), generic_titles=generic)
+
+    @classmethod
+    def from_output_dir(cls, output_dir: Path) -> "MethodRouter":
+        output_dir = Path(output_dir)
+        entities = pd.read_parquet(output_dir / "create_final_entities.parquet", columns=["title"])
+        nodes = pd.read_parquet(output_dir / "create_final_nodes.parquet", columns=["title", "degree"])
+        return cls.from_tables(entities, nodes)
+
+    def match_entities(self, query: str) -> list[str]:
+        tokens = _tokens(query)
+        found: list[tuple[str, ...]] = []
+        i = 0
+        while i < len(tokens):
+            # Coincidencia más larga primero ("muscle atrophy" antes que "muscle")
+            for n in range(min(self.max_ngram, len(tokens) - i), 0, -1):
+                candidate = tuple(tokens[i:i + n])
+                if candidate in self._titles:
+                    found.append(candidate)
+                    i += n
+                    break
+            else:
+                i += 1
+
+        return list(dict.fromkeys(" ".join(t) for t in found))
+
+    def route(self, query: str) -> RouteDecision:
+        decision = self._route(query)
+        logger.info(
+            "auto -> %s (%s); entities=%s; query=%r",
+            decision.method, decision.reason, decision.entities, query[:120],
+        )
+        return decision
+
+    def _route(self, query: str) -> RouteDecision:
+        text = f" {' '.join(_tokens(query))} "
+        entities = self.match_entities(query)
+        specific = [e for e in entities if tuple(e.split()) not in self._generic]
+
+        is_global = any(cue in text for cue in GLOBAL_CUES)
+        is_comparison = any(cue in text for cue in COMPARISON_CUES)
+
+        if is_global and not specific:
+            return RouteDecision("global", "broad question without specific entities", entities)
+        if is_comparison and len(specific) >= 2:
+            return RouteDecision("drift", f"compares {len(specific)} specific entities", entities)
+        if specific:
+            return RouteDecision("local", f"mentions {len(specific)} specific entities", entities)
+        if entities:
+            return RouteDecision("local", "mentions only generic entities", entities)
+        return RouteDecision("local", "no entity hits, cheapest method by default", entities)
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable
+
+from .chatbot import INVALID_METHOD_ERROR
+
+logger = logging.getLogger(__name__)
+
+
+class SearchRejectedError(RuntimeError):
+    status_code = 503
+
+
+class SearchQueueFullError(SearchRejectedError):
+    status_code = 429
+
+
+class SearchQueueTimeoutError(SearchRejectedError):
+    status_code = 503
+
+
+@dataclass
+class _MethodLane:
+    limit: int
+    semaphore: asyncio.Semaphore = field(init=False)
+    waiting: int = 0
+    running: int = 0
+    admitted: int = 0
+    rejected: int = 0
+    timed_out: int = 0
+    queue_time_total: float = 0.0
+    queue_time_max: float = 0.0
+
+    def __post_init__(self):
+        self.semaphore = asyncio.Semaphore(self.limit)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "running": self.running,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "queue_time_avg_ms": round(1000 * self.queue_time_total / self.admitted, 2) if self.admitted else 0.0,
+            "queue_time_max_ms": round(1000 * self.queue_time_max, 2),
+        }
+
+
+class SearchScheduler:
+    """
+    Planificador de búsquedas pesadas con límite de concurrencia por método.
+
+    Cada método tiene su propio carril: como mucho `limit` búsquedas en ejecución y
+    `max_queue` esperando. Si la cola está llena se rechaza al momento (429) y si la
+    espera supera `queue_timeout` se abandona (503), en vez de dejar que una ráfaga
+    de búsquedas globales acapare el proceso.
+
+    Por defecto ejecuta en un pool de hilos propio; se le puede pasar otro `Executor`
+    (p. ej. un `ProcessPoolExecutor` con el índice precargado en cada worker).
+    """
+
+    def __init__(
+        self,
+        limits: dict[str, int],
+        max_queue: int,
+        queue_timeout: float | None = None,
+        executor: Executor | None = None,
+    ):
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._lanes = {method: _MethodLane(limit=limit) for method, limit in limits.items()}
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=sum(limits.values()),
+            thread_name_prefix="graphrag-search",
+        )
+
+    @asynccontextmanager
+    async def slot(self, method: str) -> AsyncIterator[None]:
+        lane = self._lanes.get(method)
+        if lane is None:
+            raise ValueError(INVALID_METHOD_ERROR)
+
+        start = time.perf_counter()
+        if not lane.semaphore.locked() and not lane.waiting:
+            # Hay hueco libre: se adquiere sin suspender
+            await lane.semaphore.acquire()
+        else:
+            if lane.waiting >= self.max_queue:
+                lane.rejected += 1
+                raise SearchQueueFullError(f"Too many pending '{method}' searches, try again later.")
+
+            lane.waiting += 1
+            try:
+                await asyncio.wait_for(lane.semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                lane.timed_out += 1
+                raise SearchQueueTimeoutError(f"Timed out waiting for a '{method}' search slot.")
+            finally:
+                lane.waiting -= 1
+
+        queue_time = time.perf_counter() - start
+        lane.admitted += 1
+        lane.queue_time_total += queue_time
+        lane.queue_time_max = max(lane.queue_time_max, queue_time)
+        logger.info("Search '%s' admitted after %.1f ms in queue", method, 1000 * queue_time)
+
+        lane.running += 1
+        try:
+            yield
+        finally:
+            lane.running -= 1
+            lane.semaphore.release()
+
+    async def run(self, method: str, fn: Callable[..., Any], *args: Any) -> Any:
+        async with self.slot(method):
+            return await self.run_in_executor(fn, *args)
+
+    def run_in_executor(self, fn: Callable[..., Any], *args: Any) -> asyncio.Future:
+        return asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def stats(self) -> dict[str, Any]:
+        return {method: lane.stats() for method, lane in self._lanes.items()}
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,124 @@
+import threading
+from typing import Any, Hashable, Sequence
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Caché de respuestas por similitud de la pregunta (segundo nivel tras la caché exacta).
+
+    Guarda los embeddings normalizados en una matriz de capacidad fija, de modo que
+    cada búsqueda es un único producto matriz-vector en NumPy. Las entradas se agrupan
+    por `namespace` (método + versión del índice) y se expulsan por LRU; un namespace
+    se olvida cuando se expulsa su última entrada (p. ej. el de un índice ya sustituido).
+    """
+
+    def __init__(self, capacity: int, threshold: float = 0.92):
+        self.capacity = capacity
+        self.threshold = threshold
+
+        self._vectors: np.ndarray | None = None  # (capacity, dim), se reserva con el primer embedding
+        self._namespaces = np.full(capacity, -1, dtype=np.int64)
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._answers: list[Any | None] = [None] * capacity
+        self._namespace_ids: dict[Hashable, int] = {}
+        self._next_namespace = 0
+        self._clock = 0
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, namespace: Hashable, vector: Sequence[float]) -> Any | None:
+        with self._lock:
+            ns = self._namespace_ids.get(namespace)
+            query = self._normalize(vector)
+            if ns is None or self._vectors is None or query is None or query.shape[0] != self._vectors.shape[1]:
+                self.misses += 1
+                return None
+
+            scores = self._vectors @ query
+            scores[self._namespaces != ns] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self._touch(best)
+            self.hits += 1
+            return self._answers[best]
+
+    def put(self, namespace: Hashable, vector: Sequence[float], answer: Any) -> None:
+        with self._lock:
+            query = self._normalize(vector)
+            if query is None:
+                return
+
+            if self._vectors is None or self._vectors.shape[1] != query.shape[0]:
+                # Primer embedding (o cambio de modelo): reservamos la matriz con su dimensión
+                self._vectors = np.zeros((self.capacity, query.shape[0]), dtype=np.float32)
+                self._reset()
+
+            ns = self._namespace_ids.get(namespace)
+            if ns is None:
+                ns = self._namespace_ids[namespace] = self._next_namespace
+                self._next_namespace += 1
+
+            free = np.flatnonzero(self._namespaces < 0)
+            if free.size:
+                slot = int(free[0])
+                evicted = -1
+            else:
+                slot = int(np.argmin(self._last_used))
+                evicted = int(self._namespaces[slot])
+                self.evictions += 1
+
+            self._vectors[slot] = query
+            self._namespaces[slot] = ns
+            self._answers[slot] = answer
+            self._touch(slot)
+            if evicted not in (-1, ns) and not np.any(self._namespaces == evicted):
+                self._forget(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def _reset(self) -> None:
+        self._namespaces.fill(-1)
+        self._answers = [None] * self.capacity
+        self._namespace_ids.clear()
+
+    def _forget(self, ns: int) -> None:
+        """Sin entradas ya: su clave (método, versión) no vuelve a necesitarse."""
+        for namespace, value in list(self._namespace_ids.items()):
+            if value == ns:
+                del self._namespace_ids[namespace]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": int(np.count_nonzero(self._namespaces >= 0)),
+                "namespaces": len(self._namespace_ids),
+                "capacity": self.capacity,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _touch(self, slot: int) -> None:
+        self._clock += 1
+        self._last_used[slot] = self._clock
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray | None:
+        v = np.asarray(vector, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(v)) if v.size else 0.0
+        if norm == 0.0:
+            return None
+        return v / norm
@@ -8,10 +8,20 @@ class ROLE(str, Enum):
     ASSISTANT = "assistant"
     USER = "user"
 
+@dataclass(frozen=True)
+class SourceRefs:
+    """Contexto que usó la búsqueda, en forma compacta: ids cortos del índice de GraphRAG."""
+    entities: tuple[int, ...] = ()
+    relationships: tuple[int, ...] = ()
+    reports: tuple[int, ...] = ()
+    text_units: tuple[int, ...] = ()
+    version: str = ""
+
 @dataclass
 class ChatMessage:
     role: ROLE
     content: str
+    sources: SourceRefs | None = None
 
 @dataclass
 class Chat(BaseModel):
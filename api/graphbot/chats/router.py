@@ -1,9 +1,12 @@
+import json
 from uuid import UUID
 from fastapi import APIRouter, Request, Response, status, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 
 from .schemas import PromptAnswerResponse, MessageRequest, CreateChatResponse
 from .service import ChatService, ChatBusyError
 from ..deps import Deps
+from ..graph.service import GraphService
 
 router = APIRouter(tags=["chats"])
 
@@ -22,6 +25,13 @@ def create_chat(
     return CreateChatResponse(chat_uuid=new_chat.uuid)
 
 
+@router.get("/stats", status_code=status.HTTP_200_OK)
+def get_chat_stats(
+    service: ChatService = Depends(Deps.get_chat_service),
+) -> dict:
+    return service.stats()
+
+
 @router.post("/{chat_uuid}/messages", response_model=PromptAnswerResponse, status_code=status.HTTP_200_OK)
 async def post_chat_message(
     request: Request,
@@ -32,7 +42,58 @@ async def post_chat_message(
     try:
         answer = await service.reply_to_user(chat_uuid, payload.message, payload.metodo)
 
-        return PromptAnswerResponse(answer=answer)
+        return PromptAnswerResponse(answer=answer, message=service.count_messages(chat_uuid) - 1)
     
     except ChatBusyError as e:
-        raise HTTPException(status_code=409, detail=str(e))
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+
+@router.post("/{chat_uuid}/messages/stream", status_code=status.HTTP_200_OK)
+async def post_chat_message_stream(
+    request: Request,
+    chat_uuid: UUID,
+    payload: MessageRequest,
+    service: ChatService = Depends(Deps.get_chat_service),
+) -> StreamingResponse:
+    # Validamos antes de abrir el stream para poder responder 404/409 con su status real
+    service.require_chat(chat_uuid)
+    try:
+        service.ensure_not_busy(chat_uuid)
+    except ChatBusyError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    async def event_stream():
+        answer = ""
+        try:
+            async for token in service.stream_reply_to_user(chat_uuid, payload.message, payload.metodo):
+                answer += token
+                yield _sse({"token": token})
+        except Exception as e:
+            # Con el stream abierto el status ya es 200: el evento lleva el real (409 si otro
+            # mensaje tomó el chat entre la comprobación y el inicio del stream)
+            yield _sse({"detail": str(e), "status_code": getattr(e, "status_code", 500)}, event="error")
+            return
+
+        yield _sse({"answer": answer, "message": service.count_messages(chat_uuid) - 1}, event="done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{chat_uuid}/messages/{message}/sources", status_code=status.HTTP_200_OK)
+def get_message_sources(
+    chat_uuid: UUID,
+    message: int,
+    service: ChatService = Depends(Deps.get_chat_service),
+    graph: GraphService = Depends(Deps.get_graph_service),
+) -> dict:
+    # Las referencias se guardaron con el mensaje; aquí sólo se resuelven contra el índice
+    return {"message": message, **graph.sources(service.message_sources(chat_uuid, message))}
+
+
+def _sse(data: dict, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -11,6 +11,7 @@ class MessageRequest(BaseModel):
 
 class PromptAnswerResponse(BaseModel):
     answer: str = Field(example="No puedo ayudarte con eso.")
+    message: int | None = Field(None, example=1, description="Index of the answer in the chat history")
 
 class ChatMessageResponse(BaseModel):
     role: str = Field(example="assistant")
@@ -1,15 +1,18 @@
 import asyncio
 from collections import defaultdict
-from typing import Dict
+from typing import Any, AsyncIterator, Dict
 from uuid import UUID
 
-from .models import ROLE, ChatMessage, Chat
+from .models import ROLE, ChatMessage, Chat, SourceRefs
 from .chatbot import ChatBot, to_chatbot_messages
-from ..store import BaseStore
+from .chatbot.answer_cache import normalize_query
+from ..store import BaseStore, ObjectNotFoundError
+from ...utils import SingleFlight
 
 
 class ChatBusyError(RuntimeError):
-    pass
+    # Lo usa también el evento de error del stream, que ya no puede cambiar el status HTTP
+    status_code = 409
 
 
 class ChatService:
@@ -18,6 +21,8 @@ class ChatService:
         self.chatbot = chatbot
 
         self._locks: Dict[UUID, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # Preguntas idénticas en vuelo (de chats distintos) comparten una sola búsqueda
+        self._flights = SingleFlight()
     
     # "Repository"
     def create_chat(self) -> Chat:
@@ -32,8 +37,8 @@ class ChatService:
     def require_chat(self, chat_uuid: UUID) -> Chat:
         return self.store.require(chat_uuid)
 
-    def add_message(self, chat_uuid: UUID, role: ROLE, content: str) -> ChatMessage:
-        chat_msg = ChatMessage(role=role, content=content)
+    def add_message(self, chat_uuid: UUID, role: ROLE, content: str, sources: SourceRefs | None = None) -> ChatMessage:
+        chat_msg = ChatMessage(role=role, content=content, sources=sources)
         self.store.mutate(chat_uuid, lambda c: c.messages.append(chat_msg))
         return chat_msg
 
@@ -41,6 +46,13 @@ class ChatService:
         return self.store.delete(chat_uuid)
 
     # Service
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "chats": self.store.count(),
+            "chatbot": self.chatbot.stats(),
+            "coalescing": self._flights.stats(),
+        }
+
     def count_messages(self, chat_uuid: UUID) -> int:
         return len(self.require_chat(chat_uuid).messages)
 
@@ -53,10 +65,50 @@ class ChatService:
         async with lock:
             chat = self.require_chat(chat_uuid)
             chat_history = to_chatbot_messages(chat.messages)
+            # `auto` se resuelve aquí para que preguntas iguales compartan vuelo con su método real
+            method = self.chatbot.resolve_method(user_text, method)
 
-            assistant_answer = await self.chatbot.reply(user_text, chat_history, method)
+            assistant_answer = await self._flights.do(
+                (method, normalize_query(user_text)),
+                lambda: self.chatbot.reply(user_text, chat_history, method),
+            )
 
             self.add_message(chat_uuid, ROLE.USER, user_text)
-            self.add_message(chat_uuid, ROLE.ASSISTANT, assistant_answer)
+            self.add_message(chat_uuid, ROLE.ASSISTANT, assistant_answer.content, assistant_answer.sources)
+
+            return assistant_answer.content
+
+    def message_sources(self, chat_uuid: UUID, index: int) -> SourceRefs | None:
+        messages = self.require_chat(chat_uuid).messages
+        if not 0 <= index < len(messages):
+            raise ObjectNotFoundError(f"message {index} of chat {chat_uuid}")
+        return messages[index].sources
+
+    def ensure_not_busy(self, chat_uuid: UUID) -> None:
+        if self._locks[chat_uuid].locked():
+            raise ChatBusyError("An user message is already being processed.")
 
-            return assistant_answer
+    async def stream_reply_to_user(self, chat_uuid: UUID, user_text: str, method: str) -> AsyncIterator[str]:
+        lock = self._locks[chat_uuid]
+
+        if lock.locked():
+            raise ChatBusyError("An user message is already being processed.")
+
+        async with lock:
+            chat = self.require_chat(chat_uuid)
+            chat_history = to_chatbot_messages(chat.messages)
+            method = self.chatbot.resolve_method(user_text, method)
+
+            chunks: list[str] = []
+            sources = None
+            async for chunk in self.chatbot.stream_reply(user_text, chat_history, method):
+                if isinstance(chunk, SourceRefs):
+                    sources = chunk
+                    continue
+                chunks.append(chunk)
+                yield chunk
+
+            assistant_answer = "".join(chunks)
+
+            self.add_message(chat_uuid, ROLE.USER, user_text)
+            self.add_message(chat_uuid, ROLE.ASSISTANT, assistant_answer, sources)
@@ -1,13 +1,24 @@
-from fastapi import Request
+from fastapi import HTTPException, Request
 
 from .chats.service import ChatService
+from .graph.service import GraphService
 
 
 class Deps:
 
     @classmethod
     def get_chat_service(cls, request: Request) -> ChatService:
-        return request.app.state.chat_service
+        service = getattr(request.app.state, "chat_service", None)
+        if service is None:
+            raise HTTPException(status_code=503, detail="Chat backend is warming up.", headers={"Retry-After": "5"})
+        return service
 
 
 
+
+    @classmethod
+    def get_graph_service(cls, request: Request) -> GraphService:
+        service = getattr(request.app.state, "graph_service", None)
+        if service is None:
+            raise HTTPException(status_code=503, detail="Graph index is loading.", headers={"Retry-After": "5"})
+        return service
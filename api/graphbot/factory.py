@@ -1,8 +1,13 @@
+from concurrent.futures import Executor
+
 from .settings import AppSettings
 from .chats.models import Chat
 
 from .store import MemoryStore
-from .chats.chatbot import DummyBot
+from .chats.chatbot import ChatBot, DummyBot
+from .chats.chatbot.answer_cache import AnswerCache, IndexFingerprint, IndexVersionSource
+from .chats.chatbot.cached_bot import CachedBot
+from .chats.chatbot.search_scheduler import SearchScheduler
 
 def make_store(settings: AppSettings):
     store = settings.store.lower()
@@ -17,6 +22,148 @@ def make_chatbot(settings: AppSettings):
         return DummyBot()
     elif chatbot == "graphrag":
         from .chats.chatbot.graphrag_bot import GraphRAGBot
-        return GraphRAGBot()
+        from .chats.chatbot.graphrag_engine import resolve_output_dir
+        from .chats.chatbot.index_holder import IndexHolder
+
+        executor = settings.search_executor.lower()
+        if executor not in ("thread", "process"):
+            raise RuntimeError(f"Unknown search executor: {settings.search_executor}")
+
+        index = IndexHolder(
+            lambda: load_index_version(settings, executor),
+            resolve_output_dir(settings.graphrag_root, settings.graphrag_config),
+            poll_seconds=settings.graphrag_watch_interval,
+        )
+        return with_answer_cache(GraphRAGBot(index, make_search_scheduler(settings)), settings, index)
 
     raise RuntimeError(f"Unknown chatbot: {settings.chatbot}")
+
+
+def make_graph_service(settings: AppSettings):
+    from .graph.service import GraphService
+
+    output_dir = settings.graph_output_dir
+    if output_dir is None:
+        from .chats.chatbot.graphrag_engine import resolve_output_dir
+
+        output_dir = resolve_output_dir(settings.graphrag_root, settings.graphrag_config)
+    return GraphService(output_dir)
+
+
+def make_osdr_client(settings: AppSettings):
+    from ..osdr import CircuitBreaker, OsdrClient, ResponseCache
+
+    cache = None
+    if settings.osdr_cache_max_mb > 0:
+        cache = ResponseCache(
+            settings.osdr_cache_path,
+            ttl=settings.osdr_cache_ttl,
+            max_bytes=settings.osdr_cache_max_mb * 1024 * 1024,
+        )
+
+    return OsdrClient(
+        max_connections=settings.osdr_max_connections,
+        max_keepalive_connections=settings.osdr_max_keepalive,
+        keepalive_expiry=settings.osdr_keepalive_expiry,
+        http2=settings.osdr_http2,
+        connect_timeout=settings.osdr_connect_timeout,
+        timeout=settings.osdr_timeout,
+        cache=cache,
+        retries=settings.osdr_retries,
+        retry_backoff=settings.osdr_retry_backoff,
+        hedge=settings.osdr_hedge,
+        hedge_min_delay=settings.osdr_hedge_min_delay,
+        breaker=CircuitBreaker(settings.osdr_breaker_failures, settings.osdr_breaker_reset),
+    )
+
+
+def make_catalog_mirror(settings: AppSettings, osdr):
+    if settings.osdr_catalog_sync_interval <= 0:
+        return None
+    from ..osdr import CatalogMirror
+
+    return CatalogMirror(osdr, settings.osdr_catalog_path, interval=settings.osdr_catalog_sync_interval)
+
+
+def make_gap_facets(settings: AppSettings, osdr, mirror=None):
+    if settings.gap_options_refresh_interval <= 0:
+        return None
+    from ..gap_finder.facets import FacetIndex
+    from ..gap_finder.router import compute_gap_options
+
+    return FacetIndex(
+        lambda: compute_gap_options(osdr, mirror),
+        interval=settings.gap_options_refresh_interval,
+        # Con espejo, las opciones salen de su primera foto y no de otra descarga paralela
+        ready=mirror.wait_ready if mirror is not None else None,
+    )
+
+
+def load_index_version(settings: AppSettings, executor: str):
+    from .chats.chatbot.graphrag_engine import GraphRAGEngine, resolve_output_dir
+    from .chats.chatbot.index_holder import IndexVersion
+    from .chats.chatbot.method_router import MethodRouter
+
+    if executor == "process":
+        from .chats.chatbot.graphrag_worker import make_process_pool
+
+        pool = make_process_pool(
+            settings.graphrag_root,
+            settings.graphrag_config,
+            settings.graphrag_community_level,
+            processes=settings.search_processes,
+        )
+        # El proceso principal no carga el índice; el router sólo necesita los títulos
+        router = MethodRouter.from_output_dir(resolve_output_dir(settings.graphrag_root, settings.graphrag_config))
+        return IndexVersion(router=router, pool=pool)
+
+    engine = GraphRAGEngine(
+        settings.graphrag_root,
+        config_filepath=settings.graphrag_config,
+        community_level=settings.graphrag_community_level,
+    )
+    router = MethodRouter.from_tables(engine.tables["create_final_entities"], engine.tables["create_final_nodes"])
+    return IndexVersion(router=router, engine=engine)
+
+
+def make_search_scheduler(settings: AppSettings, executor: Executor | None = None) -> SearchScheduler:
+    return SearchScheduler(
+        limits={
+            "local": settings.search_concurrency_local,
+            "global": settings.search_concurrency_global,
+            "drift": settings.search_concurrency_drift,
+        },
+        max_queue=settings.search_queue_size,
+        queue_timeout=settings.search_queue_timeout,
+        executor=executor,
+    )
+
+
+def with_answer_cache(chatbot: ChatBot, settings: AppSettings, index: IndexVersionSource | None = None) -> ChatBot:
+    if settings.answer_cache_size <= 0:
+        return chatbot
+
+    semantic_cache = None
+    embed = None
+    if settings.semantic_cache_size > 0:
+        from .chats.chatbot.semantic_cache import SemanticAnswerCache
+
+        semantic_cache = SemanticAnswerCache(settings.semantic_cache_size, settings.semantic_cache_threshold)
+        embed = make_query_embedder(settings)
+
+    return CachedBot(
+        chatbot,
+        AnswerCache(settings.answer_cache_size, settings.answer_cache_ttl),
+        index or IndexFingerprint(settings.graphrag_root),
+        semantic_cache=semantic_cache,
+        embed=embed,
+    )
+
+
+def make_query_embedder(settings: AppSettings):
+    from graphrag.config.load_config import load_config
+    from graphrag.query.llm.get_client import get_text_embedder
+
+    # Mismo modelo de embeddings que usa el índice de GraphRAG
+    config = load_config(settings.graphrag_root.resolve(), settings.graphrag_config)
+    return get_text_embedder(config).aembed
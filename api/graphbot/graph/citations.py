@@ -0,0 +1,141 @@
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+from ..chats.models import SourceRefs
+
+# Peso de cada tipo de referencia al puntuar un fragmento de texto
+DIRECT_WEIGHT = 2.0
+ENTITY_WEIGHT = 1.0
+RELATIONSHIP_WEIGHT = 0.5
+
+
+def _csr(keys: np.ndarray, lists: Iterable[Iterable[Any]], lookup: dict[Any, int]) -> tuple[dict[int, int], np.ndarray, np.ndarray]:
+    """Filas `key -> [posiciones]` en arrays planos (indptr, values)."""
+    rows: dict[int, int] = {}
+    lengths, values = [], []
+    for key, items in zip(keys, lists):
+        mapped = [lookup[i] for i in (items if items is not None else []) if i in lookup]
+        rows[int(key)] = len(lengths)
+        lengths.append(len(mapped))
+        values.extend(mapped)
+    indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    return rows, indptr, np.array(values, dtype=np.int64)
+
+
+class CitationIndex:
+    """
+    Índice invertido entidad/relación -> fragmentos de texto -> documentos.
+
+    Las respuestas del chat guardan sólo los ids cortos del contexto (`SourceRefs`);
+    aquí se resuelven a fragmentos y documentos sin repetir la búsqueda. Cada
+    fragmento puntúa por las referencias que llegan a él (directas, por entidad o
+    por relación) y cada documento suma las de sus fragmentos.
+    """
+
+    def __init__(
+        self,
+        entities: pd.DataFrame,
+        relationships: pd.DataFrame,
+        text_units: pd.DataFrame,
+        documents: pd.DataFrame,
+        reports: pd.DataFrame,
+    ):
+        self.unit_ids = text_units["id"].to_numpy(dtype=object)
+        self.unit_texts = text_units["text"].fillna("").to_numpy(dtype=object)
+        self.unit_short_ids = text_units["human_readable_id"].to_numpy(np.int64)
+        unit_rows = {u: i for i, u in enumerate(self.unit_ids)}
+        self._unit_by_short_id = {int(u): i for i, u in enumerate(self.unit_short_ids)}
+
+        self.document_ids = documents["id"].to_numpy(dtype=object)
+        self.document_titles = documents["title"].fillna("").to_numpy(dtype=object)
+        document_rows = {d: i for i, d in enumerate(self.document_ids)}
+
+        self.entity_titles = dict(zip(entities["human_readable_id"].astype(int), entities["title"]))
+        self._entities = _csr(entities["human_readable_id"].to_numpy(), entities["text_unit_ids"], unit_rows)
+        self._relationships = _csr(
+            relationships["human_readable_id"].to_numpy(), relationships["text_unit_ids"], unit_rows,
+        )
+        _rows, self._unit_docs_ptr, self._unit_docs = _csr(
+            np.arange(len(self.unit_ids)), text_units["document_ids"], document_rows,
+        )
+        # Fragmento de cada entrada de `_unit_docs` (la inversa fragmento <- documento)
+        self._doc_entry_units = np.repeat(np.arange(len(self.unit_ids)), np.diff(self._unit_docs_ptr))
+        self.report_titles = dict(zip(reports["community"].astype(int), reports["title"]))
+
+    @classmethod
+    def from_output_dir(cls, output_dir: Path) -> "CitationIndex":
+        output_dir = Path(output_dir)
+        return cls(
+            pd.read_parquet(output_dir / "create_final_entities.parquet", columns=["human_readable_id", "title", "text_unit_ids"]),
+            pd.read_parquet(output_dir / "create_final_relationships.parquet", columns=["human_readable_id", "text_unit_ids"]),
+            pd.read_parquet(output_dir / "create_final_text_units.parquet", columns=["id", "human_readable_id", "text", "document_ids"]),
+            pd.read_parquet(output_dir / "create_final_documents.parquet", columns=["id", "title"]),
+            pd.read_parquet(output_dir / "create_final_community_reports.parquet", columns=["community", "title"]),
+        )
+
+    def units_of(self, kind: str, short_id: int) -> np.ndarray:
+        rows, indptr, values = self._entities if kind == "entity" else self._relationships
+        row = rows.get(int(short_id))
+        if row is None:
+            return np.empty(0, dtype=np.int64)
+        return values[indptr[row]:indptr[row + 1]]
+
+    def resolve(self, refs: SourceRefs, max_documents: int = 10, max_units: int = 3, excerpt: int = 300) -> dict[str, Any]:
+        direct = np.array([self._unit_by_short_id[u] for u in refs.text_units if u in self._unit_by_short_id], dtype=np.int64)
+        by_entity = [(e, self.units_of("entity", e)) for e in refs.entities]
+        by_relationship = [self.units_of("relationship", r) for r in refs.relationships]
+
+        units = np.concatenate([direct, *[u for _e, u in by_entity], *by_relationship, np.empty(0, dtype=np.int64)])
+        weights = np.concatenate([
+            np.full(len(direct), DIRECT_WEIGHT),
+            *[np.full(len(u), ENTITY_WEIGHT) for _e, u in by_entity],
+            *[np.full(len(u), RELATIONSHIP_WEIGHT) for u in by_relationship],
+            np.empty(0),
+        ])
+        unit_scores = np.bincount(units, weights=weights, minlength=len(self.unit_ids))
+
+        # Documentos: suma de la puntuación de sus fragmentos
+        doc_scores = np.bincount(
+            self._unit_docs,
+            weights=unit_scores[self._doc_entry_units],
+            minlength=len(self.document_ids),
+        )
+
+        entities_of_unit: dict[int, list[str]] = {}
+        for entity, entity_units in by_entity:
+            for u in entity_units:
+                entities_of_unit.setdefault(int(u), []).append(self.entity_titles.get(entity, ""))
+
+        documents = []
+        for d in np.argsort(-doc_scores, kind="stable")[:max_documents]:
+            if doc_scores[d] <= 0:
+                break
+            doc_units = self._doc_entry_units[self._unit_docs == d]
+            doc_units = doc_units[unit_scores[doc_units] > 0]
+            doc_units = doc_units[np.argsort(-unit_scores[doc_units], kind="stable")][:max_units]
+            documents.append({
+                "id": self.document_ids[d],
+                "title": self.document_titles[d],
+                "score": float(doc_scores[d]),
+                "text_units": [
+                    {
+                        "id": int(self.unit_short_ids[u]),
+                        "score": float(unit_scores[u]),
+                        "excerpt": self.unit_texts[u][:excerpt],
+                        "entities": entities_of_unit.get(int(u), []),
+                    }
+                    for u in doc_units
+                ],
+            })
+
+        return {
+            "documents": documents,
+            "entities": [self.entity_titles[e] for e in refs.entities if e in self.entity_titles],
+            "reports": [
+                {"community": r, "title": self.report_titles[r]} for r in refs.reports if r in self.report_titles
+            ],
+        }
@@ -0,0 +1,200 @@
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .search import EntitySearchIndex
+
+
+def normalize_title(title: str) -> str:
+    # Los títulos de GraphRAG vienen en mayúsculas; aceptamos cualquier capitalización
+    return " ".join(str(title).split()).upper()
+
+
+class GraphIndex:
+    """
+    Grafo de entidades de GraphRAG en memoria, como adyacencia CSR no dirigida.
+
+    `indptr[i]:indptr[i + 1]` delimita los vecinos de la entidad `i` en `indices`
+    (ordenados por id de vecino, para buscar una arista con `searchsorted`) y en
+    `edge_ids` (fila de la relación en las tablas de aristas). `by_weight` es la
+    misma fila ordenada por peso descendente, para paginar vecinos por relevancia.
+    """
+
+    def __init__(self, entities: pd.DataFrame, relationships: pd.DataFrame):
+        entities = entities.drop_duplicates("title").reset_index(drop=True)
+        self.ids = entities["id"].to_numpy(dtype=object)
+        self.titles = entities["title"].to_numpy(dtype=object)
+        self.types = entities["type"].fillna("").to_numpy(dtype=object)
+        self.descriptions = entities["description"].fillna("").to_numpy(dtype=object)
+        self._by_title = {normalize_title(t): i for i, t in enumerate(self.titles)}
+        self._by_id = {e: i for i, e in enumerate(self.ids)}
+
+        # Aristas con ambos extremos conocidos
+        source = relationships["source"].map(lambda t: self._by_title.get(normalize_title(t), -1)).to_numpy(np.int64)
+        target = relationships["target"].map(lambda t: self._by_title.get(normalize_title(t), -1)).to_numpy(np.int64)
+        known = (source >= 0) & (target >= 0)
+        relationships = relationships[known].reset_index(drop=True)
+
+        self.edge_source = source[known]
+        self.edge_target = target[known]
+        self.edge_ids = relationships["id"].to_numpy(dtype=object)
+        self.edge_weights = relationships["weight"].fillna(1.0).to_numpy(np.float64)
+        self.edge_ranks = (
+            relationships["combined_degree"].fillna(0).to_numpy(np.int64)
+            if "combined_degree" in relationships
+            else np.zeros(len(relationships), dtype=np.int64)
+        )
+        self.edge_descriptions = relationships["description"].fillna("").to_numpy(dtype=object)
+
+        n = len(self.titles)
+        m = len(self.edge_source)
+
+        # Cada relación aparece en la fila de sus dos extremos
+        rows = np.concatenate([self.edge_source, self.edge_target])
+        cols = np.concatenate([self.edge_target, self.edge_source])
+        edges = np.concatenate([np.arange(m), np.arange(m)])
+
+        order = np.lexsort((cols, rows))
+        self.indices = cols[order]
+        self.edge_index = edges[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=self.indptr[1:])
+        self.degrees = np.diff(self.indptr)
+
+        weights = self.edge_weights[self.edge_index]
+        row_of = np.repeat(np.arange(n), self.degrees)
+        self.by_weight = np.lexsort((self.indices, -weights, row_of))
+
+        self.search_index = EntitySearchIndex(self.titles, self.descriptions, self.degrees)
+        # Coordenadas (n, 2) del layout precalculado, cuando estén disponibles
+        self.positions: np.ndarray | None = None
+
+    @classmethod
+    def from_output_dir(cls, output_dir: Path) -> "GraphIndex":
+        output_dir = Path(output_dir)
+        entities = pd.read_parquet(
+            output_dir / "create_final_entities.parquet",
+            columns=["id", "title", "type", "description"],
+        )
+        relationships = pd.read_parquet(
+            output_dir / "create_final_relationships.parquet",
+            columns=["id", "source", "target", "weight", "combined_degree", "description"],
+        )
+        return cls(entities, relationships)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.titles)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.edge_source)
+
+    def lookup(self, title: str) -> int | None:
+        return self._by_title.get(normalize_title(title))
+
+    def lookup_id(self, entity_id: str) -> int | None:
+        return self._by_id.get(entity_id)
+
+    def neighbors(self, node: int, offset: int = 0, limit: int = 50) -> tuple[np.ndarray, np.ndarray]:
+        """Vecinos de `node` (y la relación que los une) por peso descendente."""
+        positions = self.by_weight[self.indptr[node] + offset:self.indptr[node + 1]][:limit]
+        return self.indices[positions], self.edge_index[positions]
+
+    def edges_between(self, a: int, b: int) -> np.ndarray:
+        row = self.indices[self.indptr[a]:self.indptr[a + 1]]
+        lo, hi = np.searchsorted(row, b, side="left"), np.searchsorted(row, b, side="right")
+        return self.edge_index[self.indptr[a] + lo:self.indptr[a] + hi]
+
+    def subgraph(
+        self,
+        seeds: np.ndarray,
+        hops: int = 1,
+        max_nodes: int = 200,
+        min_weight: float = 0.0,
+        max_edges: int | None = None,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, bool]:
+        """
+        Vecindario de `hops` saltos alrededor de `seeds`, un frente completo por iteración.
+
+        En cada salto se recogen de golpe todas las filas CSR del frente, se descartan
+        las relaciones con peso < `min_weight` y los nodos ya visitados, y los candidatos
+        se priorizan por su mejor peso (y rank) hasta agotar `max_nodes`. Devuelve
+        (nodos, distancia en saltos de cada nodo, aristas inducidas, recortado).
+        """
+        n = self.node_count
+        seeds = np.unique(np.asarray(seeds, dtype=np.int64))[:max_nodes]
+        hop_of = np.full(n, -1, dtype=np.int64)
+        hop_of[seeds] = 0
+        count = len(seeds)
+        truncated = False
+
+        frontier = seeds
+        for hop in range(1, hops + 1):
+            if not frontier.size or count >= max_nodes:
+                truncated = truncated or bool(frontier.size)
+                break
+
+            # Posiciones CSR de todas las filas del frente, sin bucles por nodo
+            starts, lengths = self.indptr[frontier], self.degrees[frontier]
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+            positions = offsets + np.arange(lengths.sum())
+
+            candidates = self.indices[positions]
+            edges = self.edge_index[positions]
+            keep = (hop_of[candidates] < 0) & (self.edge_weights[edges] >= min_weight)
+            candidates, edges = candidates[keep], edges[keep]
+            if not candidates.size:
+                break
+
+            # Mejor relación de cada candidato: peso, luego rank
+            order = np.lexsort((-self.edge_ranks[edges], -self.edge_weights[edges]))
+            candidates, edges = candidates[order], edges[order]
+            unique, first = np.unique(candidates, return_index=True)
+            best = unique[np.argsort(first, kind="stable")]
+
+            budget = max_nodes - count
+            if best.size > budget:
+                best = best[:budget]
+                truncated = True
+
+            hop_of[best] = hop
+            count += best.size
+            frontier = best
+
+        nodes = np.flatnonzero(hop_of >= 0)
+        inside = (hop_of[self.edge_source] >= 0) & (hop_of[self.edge_target] >= 0) & (self.edge_weights >= min_weight)
+        edges = np.flatnonzero(inside)
+        if max_edges is not None and edges.size > max_edges:
+            edges = edges[np.lexsort((-self.edge_ranks[edges], -self.edge_weights[edges]))][:max_edges]
+            truncated = True
+
+        return nodes, hop_of[nodes], edges, truncated
+
+    def node(self, i: int) -> dict[str, Any]:
+        x, y = self.position(i)
+        return {
+            "id": self.ids[i],
+            "title": self.titles[i],
+            "type": self.types[i],
+            "degree": int(self.degrees[i]),
+            "description": self.descriptions[i],
+            "x": x,
+            "y": y,
+        }
+
+    def position(self, i: int) -> tuple[float | None, float | None]:
+        if self.positions is None or np.isnan(self.positions[i]).any():
+            return None, None
+        return float(self.positions[i, 0]), float(self.positions[i, 1])
+
+    def edge(self, e: int) -> dict[str, Any]:
+        return {
+            "id": self.edge_ids[e],
+            "source": self.titles[self.edge_source[e]],
+            "target": self.titles[self.edge_target[e]],
+            "weight": float(self.edge_weights[e]),
+            "description": self.edge_descriptions[e],
+        }
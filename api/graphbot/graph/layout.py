@@ -0,0 +1,224 @@
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from ..chats.chatbot.answer_cache import IndexFingerprint
+from .index import GraphIndex
+
+logger = logging.getLogger(__name__)
+
+# Fuera del glob "*.parquet" para no cambiar la huella del índice al guardarlo
+LAYOUT_FILE = "graph_layout.arrow"
+
+# Por encima de esto la descomposición densa del laplaciano es demasiado cara
+SPECTRAL_MAX_NODES = 3000
+
+# Por encima de esto la repulsión exacta O(n²) se sustituye por la de rejilla
+EXACT_MAX_NODES = 5000
+# Lado máximo de la rejilla (32x32 centros de masa)
+GRID_MAX_CELLS = 32
+
+
+def spectral_positions(index: GraphIndex, seed: int = 0) -> np.ndarray:
+    """Posición inicial: 2º y 3º autovectores del laplaciano normalizado."""
+    n = index.node_count
+    if n < 3 or n > SPECTRAL_MAX_NODES:
+        return np.random.default_rng(seed).uniform(-1, 1, size=(n, 2))
+
+    adjacency = np.zeros((n, n))
+    np.add.at(adjacency, (index.edge_source, index.edge_target), index.edge_weights)
+    adjacency += adjacency.T
+    degree = adjacency.sum(axis=1)
+    inv_sqrt = np.where(degree > 0, 1 / np.sqrt(np.maximum(degree, 1e-12)), 0.0)
+    laplacian = np.eye(n) - inv_sqrt[:, None] * adjacency * inv_sqrt[None, :]
+
+    _values, vectors = np.linalg.eigh(laplacian)
+    positions = vectors[:, 1:3] * inv_sqrt[:, None]
+    # Los nodos aislados quedan en el origen; un poco de ruido para que la fuerza los separe
+    positions += np.random.default_rng(seed).normal(scale=1e-3, size=positions.shape)
+    return positions / max(np.abs(positions).max(), 1e-12)
+
+
+def force_layout(
+    index: GraphIndex,
+    iterations: int = 100,
+    memory_budget: int = 64 * 1024 * 1024,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Fruchterman-Reingold vectorizado partiendo de la posición espectral.
+
+    Hasta `EXACT_MAX_NODES` nodos la repulsión se calcula entre todos los pares; por
+    encima, exacta entre celdas vecinas de una rejilla y contra los centros de masa de
+    las celdas lejanas (aproximación tipo Barnes-Hut). En ambos casos por bloques de
+    filas dimensionados con `memory_budget` bytes. La atracción se suma sobre el array
+    de aristas con `bincount`. Devuelve coordenadas (n, 2) normalizadas a [-1, 1].
+    """
+    n = index.node_count
+    positions = spectral_positions(index, seed)
+    if n < 2:
+        return positions
+
+    k = 1 / np.sqrt(n)
+    temperature = 0.1
+    source, target = index.edge_source, index.edge_target
+    weights = index.edge_weights / index.edge_weights.max() if index.edge_count else index.edge_weights
+
+    for _ in range(iterations):
+        if n <= EXACT_MAX_NODES:
+            displacement = _repulsion(positions, positions, None, k * k, 1e-9, memory_budget)
+        else:
+            displacement = _grid_repulsion(positions, k, memory_budget)
+
+        delta = positions[source] - positions[target]
+        distance = np.maximum(np.sqrt((delta ** 2).sum(axis=-1)), 1e-9)
+        pull = delta * (weights * distance / k)[:, None]
+        for axis in range(2):
+            displacement[:, axis] -= np.bincount(source, weights=pull[:, axis], minlength=n)
+            displacement[:, axis] += np.bincount(target, weights=pull[:, axis], minlength=n)
+
+        # Gravedad suave: las componentes desconectadas no se alejan sin límite
+        displacement -= 0.05 * positions
+
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=-1)), 1e-9)
+        positions += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature *= 0.97
+
+    positions -= positions.mean(axis=0)
+    return positions / max(np.abs(positions).max(), 1e-12)
+
+
+def _repulsion(
+    positions: np.ndarray,
+    sources: np.ndarray,
+    masses: np.ndarray | None,
+    strength: float,
+    min_distance2: float,
+    memory_budget: int,
+) -> np.ndarray:
+    """Repulsión de cada posición frente a `sources` (con masa), por bloques que caben en el presupuesto."""
+    displacement = np.zeros_like(positions)
+    # Cada fila del bloque ocupa 3 floats de 8 bytes por fuente (`dx`, `dy` y el peso)
+    rows = max(1, memory_budget // (24 * len(sources)))
+    scale = strength if masses is None else strength * masses
+    for start in range(0, len(positions), rows):
+        block = positions[start:start + rows]
+        dx = block[:, 0:1] - sources[None, :, 0]
+        dy = block[:, 1:2] - sources[None, :, 1]
+        weight = dx * dx
+        weight += dy * dy
+        np.maximum(weight, min_distance2, out=weight)
+        np.divide(scale, weight, out=weight)
+        displacement[start:start + rows, 0] = np.einsum("ij,ij->i", dx, weight)
+        displacement[start:start + rows, 1] = np.einsum("ij,ij->i", dy, weight)
+    return displacement
+
+
+def _grid_repulsion(positions: np.ndarray, k: float, memory_budget: int) -> np.ndarray:
+    """
+    Repulsión tipo Barnes-Hut sobre una rejilla.
+
+    Cada nodo se repele de forma exacta de los nodos de su celda y de las 8 vecinas,
+    y sólo frente al centro de masa de las celdas más lejanas, donde la aproximación
+    apenas cambia la fuerza. Así los nodos cercanos no se apilan dentro de una celda.
+    """
+    n = len(positions)
+    grid = min(GRID_MAX_CELLS, int(np.sqrt(n)))
+    low = positions.min(axis=0)
+    span = max(float((positions.max(axis=0) - low).max()), 1e-12)
+    cells = np.minimum(((positions - low) / span * grid).astype(np.int64), grid - 1)
+    flat = cells[:, 0] * grid + cells[:, 1]
+
+    masses = np.bincount(flat, minlength=grid * grid).astype(float)
+    centers = np.stack(
+        [np.bincount(flat, weights=positions[:, axis], minlength=grid * grid) for axis in range(2)], axis=-1,
+    ) / np.maximum(masses, 1)[:, None]
+    occupied = np.flatnonzero(masses)
+    occupied_x, occupied_y = occupied // grid, occupied % grid
+
+    # Nodos ordenados por celda: los de la celda c son order[bounds[c]:bounds[c + 1]]
+    order = np.argsort(flat, kind="stable")
+    bounds = np.concatenate([[0], np.cumsum(masses.astype(np.int64))])
+
+    strength = k * k
+    displacement = np.zeros_like(positions)
+    for cell in occupied:
+        x, y = divmod(int(cell), grid)
+        members = order[bounds[cell]:bounds[cell + 1]]
+        near = (np.abs(occupied_x - x) <= 1) & (np.abs(occupied_y - y) <= 1)
+        neighbours = np.concatenate([order[bounds[c]:bounds[c + 1]] for c in occupied[near]])
+        far = occupied[~near]
+
+        block = positions[members]
+        force = _repulsion(block, positions[neighbours], None, strength, 1e-9, memory_budget)
+        if len(far):
+            force += _repulsion(block, centers[far], masses[far], strength, 1e-9, memory_budget)
+        displacement[members] = force
+    return displacement
+
+
+def load_layout(output_dir: Path, version: str, index: GraphIndex) -> np.ndarray | None:
+    path = Path(output_dir) / LAYOUT_FILE
+    if not path.exists():
+        return None
+
+    table = feather.read_table(path)
+    metadata = table.schema.metadata or {}
+    if metadata.get(b"version", b"").decode() != version:
+        return None
+
+    positions = np.full((index.node_count, 2), np.nan)
+    nodes = [index.lookup_id(e) for e in table.column("id").to_pylist()]
+    found = np.array([i is not None for i in nodes], dtype=bool)
+    rows = np.array([i for i in nodes if i is not None], dtype=np.int64)
+    positions[rows, 0] = table.column("x").to_numpy()[found]
+    positions[rows, 1] = table.column("y").to_numpy()[found]
+    return positions
+
+
+def save_layout(output_dir: Path, version: str, index: GraphIndex, positions: np.ndarray) -> None:
+    path = Path(output_dir) / LAYOUT_FILE
+    table = pa.table(
+        {
+            "id": pa.array(index.ids, type=pa.string()),
+            "title": pa.array(index.titles, type=pa.string()),
+            "x": pa.array(positions[:, 0], type=pa.float32()),
+            "y": pa.array(positions[:, 1], type=pa.float32()),
+        },
+        metadata={"version": version},
+    )
+    tmp = path.with_suffix(".tmp")
+    feather.write_feather(table, tmp)
+    os.replace(tmp, path)
+
+
+def compute_layout(output_dir: Path, index: GraphIndex | None = None, version: str | None = None) -> np.ndarray:
+    """Posiciones del índice actual: las guardadas si son de esta versión; si no, se calculan y guardan."""
+    version = version or IndexFingerprint.compute(output_dir)
+    index = index or GraphIndex.from_output_dir(output_dir)
+
+    positions = load_layout(output_dir, version, index)
+    if positions is not None:
+        return positions
+
+    start = time.perf_counter()
+    positions = force_layout(index)
+    logger.info("Graph layout for %s computed in %.1f s", version[:12], time.perf_counter() - start)
+    try:
+        save_layout(output_dir, version, index, positions)
+    except OSError as e:
+        # Salida de sólo lectura: la usamos igualmente desde memoria
+        logger.warning("Could not store the graph layout: %s", e)
+    return positions
+
+
+if __name__ == "__main__":
+    # Etapa offline tras indexar: python -m api.graphbot.graph.layout <carpeta output>
+    logging.basicConfig(level=logging.INFO)
+    compute_layout(Path(sys.argv[1]))
@@ -0,0 +1,105 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.responses import JSONResponse
+
+from .schemas import EdgesResponse, EntitySearchResponse, NeighborsResponse, SubgraphResponse
+from .service import GraphService
+from .tiles import ARROW_MEDIA_TYPE, encode_arrow
+from ..deps import Deps
+
+router = APIRouter(tags=["graph"])
+
+
+@router.get("/stats", status_code=status.HTTP_200_OK)
+def get_graph_stats(
+    service: GraphService = Depends(Deps.get_graph_service),
+) -> dict:
+    return service.stats()
+
+
+@router.get("/entities/search", response_model=EntitySearchResponse, status_code=status.HTTP_200_OK)
+def search_entities(
+    q: str = Query(..., min_length=1, description="Prefix or approximate entity name"),
+    limit: int = Query(10, ge=1, le=100),
+    type: str | None = Query(None, description="Restrict to an entity type (PERSON, ORGANIZATION...)"),
+    service: GraphService = Depends(Deps.get_graph_service),
+) -> EntitySearchResponse:
+    # Autocompletado: prefijo del título, palabras de la descripción y, si faltan, coincidencia difusa
+    return service.search_entities(q, limit, type)
+
+
+@router.get("/neighbors", response_model=NeighborsResponse, status_code=status.HTTP_200_OK)
+def get_neighbors(
+    entity: str = Query(..., description="Entity title (case-insensitive)"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    service: GraphService = Depends(Deps.get_graph_service),
+) -> NeighborsResponse:
+    # Vecinos ordenados por peso de la relación, de mayor a menor
+    return service.neighbors(entity, offset, limit)
+
+
+@router.get("/edges", response_model=EdgesResponse, status_code=status.HTTP_200_OK)
+def get_edges(
+    source: str = Query(..., description="Entity title (case-insensitive)"),
+    target: str = Query(..., description="Entity title (case-insensitive)"),
+    service: GraphService = Depends(Deps.get_graph_service),
+) -> EdgesResponse:
+    return service.edges_between(source, target)
+
+
+@router.get("/subgraph", response_model=SubgraphResponse, status_code=status.HTTP_200_OK)
+def get_subgraph(
+    entities: list[str] = Query(..., description="Seed entity titles (repeat the parameter)"),
+    hops: int = Query(2, ge=0, le=4),
+    max_nodes: int = Query(200, ge=1, le=5000),
+    min_weight: float = Query(0.0, ge=0, description="Skip relationships below this weight"),
+    max_edges: int | None = Query(None, ge=1, description="Keep only the strongest edges"),
+    service: GraphService = Depends(Deps.get_graph_service),
+) -> SubgraphResponse:
+    return service.subgraph(entities, hops, max_nodes, min_weight, max_edges)
+
+
+@router.get("/layout", status_code=status.HTTP_200_OK)
+def get_layout(
+    request: Request,
+    format: Literal["arrow", "json"] = Query("arrow", description="Arrow IPC stream or JSON records"),
+    service: GraphService = Depends(Deps.get_graph_service),
+) -> Response:
+    # Coordenadas precalculadas de todas las entidades: el cliente pinta sin simular
+    table, etag = service.layout_table()
+    etag = etag if format == "arrow" else etag[:-1] + '-json"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=300"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if format == "json":
+        return JSONResponse(table.to_pylist(), headers=headers)
+    return Response(encode_arrow(table), media_type=ARROW_MEDIA_TYPE, headers=headers)
+
+
+@router.get("/tiles", status_code=status.HTTP_200_OK)
+def get_tile_levels(
+    service: GraphService = Depends(Deps.get_graph_service),
+) -> dict:
+    return {"version": service.version, "levels": service.tiles().summary()}
+
+
+@router.get("/tiles/{level}/{part}", status_code=status.HTTP_200_OK)
+def get_tile(
+    request: Request,
+    level: int,
+    part: Literal["nodes", "edges"],
+    format: Literal["arrow", "json"] = Query("arrow", description="Arrow IPC stream or JSON records"),
+    service: GraphService = Depends(Deps.get_graph_service),
+) -> Response:
+    tiles, etag = service.tile(level, part)
+    etag = etag if format == "arrow" else etag[:-1] + '-json"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=300"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if format == "json":
+        return JSONResponse(tiles.table(level, part).to_pylist(), headers=headers)
+    return Response(tiles.arrow(level, part), media_type=ARROW_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,52 @@
+from pydantic import BaseModel, Field
+
+
+class GraphNodeResponse(BaseModel):
+    id: str
+    title: str = Field(example="MICROGRAVITY")
+    type: str = Field(example="EVENT")
+    degree: int = Field(example=23)
+    description: str = ""
+    x: float | None = Field(None, example=0.12)
+    y: float | None = Field(None, example=-0.4)
+
+class GraphEdgeResponse(BaseModel):
+    id: str
+    source: str = Field(example="MICROGRAVITY")
+    target: str = Field(example="MUSCLE ATROPHY")
+    weight: float = Field(example=8.0)
+    description: str = ""
+
+class NeighborResponse(BaseModel):
+    node: GraphNodeResponse
+    edge: GraphEdgeResponse
+
+class NeighborsResponse(BaseModel):
+    entity: GraphNodeResponse
+    total: int
+    offset: int
+    limit: int
+    neighbors: list[NeighborResponse]
+
+class EdgesResponse(BaseModel):
+    source: str
+    target: str
+    edges: list[GraphEdgeResponse]
+
+class SubgraphNodeResponse(GraphNodeResponse):
+    hop: int = Field(example=1)
+
+class SubgraphResponse(BaseModel):
+    seeds: list[str]
+    missing: list[str]
+    truncated: bool
+    nodes: list[SubgraphNodeResponse]
+    edges: list[GraphEdgeResponse]
+
+class EntitySearchResult(GraphNodeResponse):
+    match: str = Field(example="prefix")
+    score: float = Field(example=1.0)
+
+class EntitySearchResponse(BaseModel):
+    query: str
+    results: list[EntitySearchResult]
@@ -0,0 +1,113 @@
+import re
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+
+# Mayor que cualquier carácter real: `prefix + _MAX_CHAR` acota el rango del prefijo
+_MAX_CHAR = "\U0010ffff"
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class EntitySearchIndex:
+    """
+    Índice de autocompletado sobre los títulos (y descripciones) de las entidades.
+
+    - Prefijo: array ordenado con cada sufijo del título que empieza en palabra
+      ("muscle atrophy", "atrophy"), así "atro" encuentra MUSCLE ATROPHY con dos
+      `searchsorted`.
+    - Descripción: igual, con las palabras de la descripción (tercer nivel).
+    - Difuso: índice invertido de trigramas del título; la similitud de Jaccard de
+      todos los candidatos sale de un `bincount` sobre las listas de postings.
+
+    Dentro de cada nivel (con el título exacto primero) se ordena por grado de la entidad.
+    """
+
+    def __init__(self, titles: np.ndarray, descriptions: np.ndarray, degrees: np.ndarray):
+        self.degrees = np.asarray(degrees)
+        normalized = [normalize_text(t) for t in titles]
+        self.normalized = np.array(normalized, dtype=str)
+
+        self.title_keys, self.title_ids = self._build_prefix(
+            (i, words[j:]) for i, title in enumerate(normalized) for words in [title.split()] for j in range(len(words))
+        )
+        self.description_keys, self.description_ids = self._build_prefix(
+            (i, [word]) for i, description in enumerate(descriptions) for word in set(normalize_text(description).split())
+        )
+
+        postings: dict[str, list[int]] = defaultdict(list)
+        self.trigram_counts = np.zeros(len(normalized), dtype=np.int64)
+        for i, title in enumerate(normalized):
+            grams = trigrams(title)
+            self.trigram_counts[i] = len(grams)
+            for gram in grams:
+                postings[gram].append(i)
+        self.postings = {gram: np.array(ids, dtype=np.int64) for gram, ids in postings.items()}
+
+    @staticmethod
+    def _build_prefix(pairs) -> tuple[np.ndarray, np.ndarray]:
+        keys, ids = [], []
+        for i, words in pairs:
+            keys.append(" ".join(words))
+            ids.append(i)
+        keys_array = np.array(keys, dtype=str)
+        ids_array = np.array(ids, dtype=np.int64)
+        order = np.argsort(keys_array, kind="stable")
+        return keys_array[order], ids_array[order]
+
+    def prefix(self, query: str, description: bool = False) -> np.ndarray:
+        keys, ids = (self.description_keys, self.description_ids) if description else (self.title_keys, self.title_ids)
+        lo = np.searchsorted(keys, query, side="left")
+        hi = np.searchsorted(keys, query + _MAX_CHAR, side="left")
+        return np.unique(ids[lo:hi])
+
+    def fuzzy(self, query: str, min_similarity: float = 0.3) -> tuple[np.ndarray, np.ndarray]:
+        grams = [self.postings[g] for g in trigrams(query) if g in self.postings]
+        if not grams:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        shared = np.bincount(np.concatenate(grams), minlength=len(self.trigram_counts))
+        candidates = np.flatnonzero(shared)
+        similarity = shared[candidates] / (len(trigrams(query)) + self.trigram_counts[candidates] - shared[candidates])
+        keep = similarity >= min_similarity
+        return candidates[keep], similarity[keep]
+
+    def search(self, query: str, limit: int = 10, allowed: np.ndarray | None = None) -> list[tuple[int, str, float]]:
+        """(entidad, tipo de coincidencia, puntuación) de las `limit` mejores."""
+        query = normalize_text(query)
+        if not query:
+            return []
+
+        results: list[tuple[int, str, float]] = []
+        seen = np.zeros(len(self.degrees), dtype=bool)
+        if allowed is not None:
+            seen |= ~allowed
+
+        def take(ids: np.ndarray, match: str, scores: np.ndarray) -> None:
+            fresh = ~seen[ids]
+            ids, scores = ids[fresh], scores[fresh]
+            order = np.lexsort((-self.degrees[ids], -scores))[:limit - len(results)]
+            seen[ids[order]] = True
+            results.extend((int(i), match, float(s)) for i, s in zip(ids[order], scores[order]))
+
+        title_hits = self.prefix(query)
+        # El título exacto va delante de los que sólo empiezan igual
+        take(title_hits, "prefix", np.where(self.normalized[title_hits] == query, 2.0, 1.0))
+        if len(results) < limit:
+            description_hits = self.prefix(query, description=True)
+            take(description_hits, "description", np.full(len(description_hits), 0.5))
+        if len(results) < limit:
+            fuzzy_hits, similarity = self.fuzzy(query)
+            take(fuzzy_hits, "fuzzy", similarity * 0.5)
+
+        return results
@@ -0,0 +1,190 @@
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pyarrow as pa
+
+from ..chats.chatbot.answer_cache import IndexFingerprint
+from ..chats.models import SourceRefs
+from ..store.base_store import ObjectNotFoundError
+from .citations import CitationIndex
+from .index import GraphIndex
+from .layout import compute_layout
+from .tiles import CommunityTiles
+
+logger = logging.getLogger(__name__)
+
+
+class LayoutPendingError(RuntimeError):
+    """El layout de la versión actual del índice todavía se está calculando."""
+
+
+class GraphService:
+    """
+    Consultas sobre el grafo de entidades del índice de GraphRAG.
+
+    El `GraphIndex` se construye la primera vez que se usa y se reconstruye cuando
+    cambia la huella de los parquet (re-indexado), sin reiniciar el proceso.
+    """
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = Path(output_dir)
+        self._fingerprint = IndexFingerprint(self.output_dir)
+        self._index: GraphIndex | None = None
+        self._tiles: CommunityTiles | None = None
+        self._citations: tuple[str, CitationIndex] | None = None
+        self._version = ""
+        self._lock = threading.Lock()
+        self._layout_lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        return self._version
+
+    def index(self) -> GraphIndex:
+        version = self._fingerprint.get()
+        if self._index is None or version != self._version:
+            with self._lock:
+                if self._index is None or version != self._version:
+                    start = time.perf_counter()
+                    self._index = GraphIndex.from_output_dir(self.output_dir)
+                    self._tiles = None
+                    self._version = version
+                    logger.info(
+                        "Graph index %s built in %.1f ms (%d nodes, %d edges)",
+                        version[:12], 1000 * (time.perf_counter() - start),
+                        self._index.node_count, self._index.edge_count,
+                    )
+                    # El layout de la nueva versión se calcula (o se lee del disco) aparte
+                    self._start_layout()
+        return self._index
+
+    def _start_layout(self) -> None:
+        threading.Thread(target=self.layout, name="graph-layout", daemon=True).start()
+
+    def layout(self) -> GraphIndex:
+        index, version = self.index(), self._version
+        with self._layout_lock:
+            if index.positions is None:
+                index.positions = compute_layout(self.output_dir, index, version)
+        return index
+
+    def ready_layout(self) -> GraphIndex:
+        """Índice con coordenadas, sin esperar nunca al cálculo del layout en la petición."""
+        index = self.index()
+        if index.positions is None:
+            # Si nadie lo está calculando (p. ej. falló el anterior), se relanza en segundo plano
+            if not self._layout_lock.locked():
+                self._start_layout()
+            raise LayoutPendingError("Graph layout is being computed.")
+        return index
+
+    def tiles(self) -> CommunityTiles:
+        # Con el layout listo, cada super-nodo lleva el centro de sus miembros
+        index = self.ready_layout()
+        with self._lock:
+            if self._tiles is None or self._tiles.index is not index:
+                self._tiles = CommunityTiles.from_output_dir(index, self.output_dir)
+            return self._tiles
+
+    def tile(self, level: int, part: str) -> tuple[CommunityTiles, str]:
+        tiles = self.tiles()
+        if level not in tiles.levels:
+            raise ObjectNotFoundError(f"community level {level}")
+        # Las teselas sólo cambian con el índice: la versión sirve de ETag
+        return tiles, f'"{self._version[:16]}-{level}-{part}"'
+
+    def layout_table(self) -> tuple[pa.Table, str]:
+        index = self.ready_layout()
+        table = pa.table({
+            "id": pa.array(index.ids, type=pa.string()),
+            "title": pa.array(index.titles, type=pa.string()),
+            "degree": pa.array(index.degrees, type=pa.int32()),
+            "x": pa.array(index.positions[:, 0], type=pa.float32(), from_pandas=True),
+            "y": pa.array(index.positions[:, 1], type=pa.float32(), from_pandas=True),
+        })
+        return table, f'"{self._version[:16]}-layout"'
+
+    def citations(self) -> CitationIndex:
+        self.index()
+        version = self._version
+        with self._lock:
+            if self._citations is None or self._citations[0] != version:
+                self._citations = (version, CitationIndex.from_output_dir(self.output_dir))
+            return self._citations[1]
+
+    def sources(self, refs: SourceRefs | None) -> dict[str, Any]:
+        if refs is None:
+            return {"stale": False, "documents": [], "entities": [], "reports": []}
+        citations = self.citations()
+        # Ids de otra versión del índice pueden apuntar a otras entidades: se avisa
+        return {"stale": bool(refs.version) and refs.version != self._version, **citations.resolve(refs)}
+
+    def require_node(self, index: GraphIndex, title: str) -> int:
+        node = index.lookup(title)
+        if node is None:
+            raise ObjectNotFoundError(f"entity '{title}'")
+        return node
+
+    def neighbors(self, title: str, offset: int, limit: int) -> dict[str, Any]:
+        index = self.index()
+        node = self.require_node(index, title)
+        neighbors, edges = index.neighbors(node, offset, limit)
+        return {
+            "entity": index.node(node),
+            "total": int(index.degrees[node]),
+            "offset": offset,
+            "limit": limit,
+            "neighbors": [{"node": index.node(n), "edge": index.edge(e)} for n, e in zip(neighbors, edges)],
+        }
+
+    def edges_between(self, source: str, target: str) -> dict[str, Any]:
+        index = self.index()
+        a, b = self.require_node(index, source), self.require_node(index, target)
+        return {
+            "source": index.titles[a],
+            "target": index.titles[b],
+            "edges": [index.edge(e) for e in index.edges_between(a, b)],
+        }
+
+    def subgraph(
+        self,
+        titles: list[str],
+        hops: int,
+        max_nodes: int,
+        min_weight: float,
+        max_edges: int | None,
+    ) -> dict[str, Any]:
+        index = self.index()
+        seeds = [index.lookup(t) for t in titles]
+        missing = [t for t, s in zip(titles, seeds) if s is None]
+        seeds = [s for s in seeds if s is not None]
+        if not seeds:
+            raise ObjectNotFoundError(f"entities {missing}")
+
+        nodes, hops_of, edges, truncated = index.subgraph(
+            np.array(seeds), hops=hops, max_nodes=max_nodes, min_weight=min_weight, max_edges=max_edges,
+        )
+        return {
+            "seeds": [index.titles[s] for s in seeds],
+            "missing": missing,
+            "truncated": truncated,
+            "nodes": [{**index.node(n), "hop": int(h)} for n, h in zip(nodes, hops_of)],
+            "edges": [index.edge(e) for e in edges],
+        }
+
+    def search_entities(self, query: str, limit: int, entity_type: str | None = None) -> dict[str, Any]:
+        index = self.index()
+        allowed = index.types == entity_type.upper() if entity_type else None
+        hits = index.search_index.search(query, limit, allowed=allowed)
+        return {
+            "query": query,
+            "results": [{**index.node(i), "match": match, "score": round(score, 4)} for i, match, score in hits],
+        }
+
+    def stats(self) -> dict[str, Any]:
+        index = self.index()
+        return {"version": self._version, "nodes": index.node_count, "edges": index.edge_count}
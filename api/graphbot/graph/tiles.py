@@ -0,0 +1,161 @@
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .index import GraphIndex
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+class CommunityTiles:
+    """
+    Vista agregada del grafo por nivel de comunidad (nivel de detalle para el canvas).
+
+    En el nivel L cada entidad pertenece a su comunidad más profunda de nivel <= L
+    (los niveles altos sólo subdividen algunas comunidades). Por nivel se precalculan
+    dos tablas Arrow: super-nodos (comunidad, título del informe, tamaño, rank y sus
+    miembros de mayor grado, centrado en sus miembros si hay layout) y aristas entre comunidades (peso sumado y número de
+    relaciones). Se serializan a IPC una sola vez, al pedirse por primera vez.
+    """
+
+    def __init__(
+        self,
+        index: GraphIndex,
+        communities: pd.DataFrame,
+        reports: pd.DataFrame,
+        top_members: int = 5,
+    ):
+        self.index = index
+        self.levels = sorted(int(level) for level in communities["level"].unique())
+        self._tables: dict[int, dict[str, pa.Table]] = {}
+        self._encoded: dict[tuple[int, str], bytes] = {}
+
+        reports = reports.set_index("community")
+        membership = np.full(index.node_count, -1, dtype=np.int64)
+        for level in self.levels:
+            at_level = communities[communities["level"] == level]
+            for community, entity_ids in zip(at_level["community"], at_level["entity_ids"]):
+                members = [index.lookup_id(e) for e in entity_ids]
+                membership[[m for m in members if m is not None]] = int(community)
+
+            self._tables[level] = {
+                "nodes": self._nodes(index, communities, reports, membership, top_members),
+                "edges": self._edges(index, membership),
+            }
+
+    @classmethod
+    def from_output_dir(cls, index: GraphIndex, output_dir: Path) -> "CommunityTiles":
+        output_dir = Path(output_dir)
+        communities = pd.read_parquet(
+            output_dir / "create_final_communities.parquet",
+            columns=["community", "level", "parent", "title", "entity_ids"],
+        )
+        reports = pd.read_parquet(
+            output_dir / "create_final_community_reports.parquet",
+            columns=["community", "title", "summary", "rank"],
+        )
+        return cls(index, communities, reports)
+
+    def table(self, level: int, part: str) -> pa.Table:
+        return self._tables[level][part]
+
+    def arrow(self, level: int, part: str) -> bytes:
+        key = (level, part)
+        if key not in self._encoded:
+            self._encoded[key] = encode_arrow(self.table(level, part))
+        return self._encoded[key]
+
+    def summary(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "level": level,
+                "communities": self._tables[level]["nodes"].num_rows,
+                "edges": self._tables[level]["edges"].num_rows,
+            }
+            for level in self.levels
+        ]
+
+    @staticmethod
+    def _nodes(
+        index: GraphIndex,
+        communities: pd.DataFrame,
+        reports: pd.DataFrame,
+        membership: np.ndarray,
+        top_members: int,
+    ) -> pa.Table:
+        members = np.flatnonzero(membership >= 0)
+        # Miembros agrupados por comunidad y, dentro de cada una, por grado descendente
+        members = members[np.lexsort((-index.degrees[members], membership[members]))]
+        ids, starts, sizes = np.unique(membership[members], return_index=True, return_counts=True)
+
+        info = communities.drop_duplicates("community").set_index("community")
+        rows = []
+        for community, start, size in zip(ids, starts, sizes):
+            report = reports.loc[community] if community in reports.index else None
+            rows.append({
+                "community": int(community),
+                "level": int(info.at[community, "level"]),
+                "parent": int(info.at[community, "parent"]),
+                "title": report["title"] if report is not None else info.at[community, "title"],
+                "summary": report["summary"] if report is not None else "",
+                "rank": float(report["rank"]) if report is not None else 0.0,
+                "size": int(size),
+                "degree": int(index.degrees[members[start:start + size]].sum()),
+                "top_members": [index.titles[m] for m in members[start:start + min(size, top_members)]],
+                **dict(zip(("x", "y"), _centroid(index, members[start:start + size]))),
+            })
+
+        return pa.Table.from_pylist(rows, schema=pa.schema([
+            ("community", pa.int32()),
+            ("level", pa.int16()),
+            ("parent", pa.int32()),
+            ("title", pa.string()),
+            ("summary", pa.string()),
+            ("rank", pa.float32()),
+            ("size", pa.int32()),
+            ("degree", pa.int32()),
+            ("top_members", pa.list_(pa.string())),
+            ("x", pa.float32()),
+            ("y", pa.float32()),
+        ]))
+
+    @staticmethod
+    def _edges(index: GraphIndex, membership: np.ndarray) -> pa.Table:
+        source = membership[index.edge_source]
+        target = membership[index.edge_target]
+        keep = (source >= 0) & (target >= 0) & (source != target)
+        source, target = source[keep], target[keep]
+        pairs = np.stack([np.minimum(source, target), np.maximum(source, target)], axis=1)
+
+        unique, inverse = np.unique(pairs, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        weights = np.bincount(inverse, weights=index.edge_weights[keep], minlength=len(unique))
+        counts = np.bincount(inverse, minlength=len(unique))
+
+        return pa.table({
+            "source": pa.array(unique[:, 0] if len(unique) else [], type=pa.int32()),
+            "target": pa.array(unique[:, 1] if len(unique) else [], type=pa.int32()),
+            "weight": pa.array(weights, type=pa.float32()),
+            "relationships": pa.array(counts, type=pa.int32()),
+        })
+
+
+def encode_arrow(table: pa.Table) -> bytes:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _centroid(index: GraphIndex, members: np.ndarray) -> tuple[float | None, float | None]:
+    if index.positions is None:
+        return None, None
+    points = index.positions[members]
+    points = points[~np.isnan(points).any(axis=1)]
+    if not len(points):
+        return None, None
+    x, y = points.mean(axis=0)
+    return float(x), float(y)
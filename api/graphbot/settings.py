@@ -15,5 +15,60 @@ class AppSettings(BaseSettings):
     chatbot: str = Field("graphrag")
 
     graphrag_root: Path = Field(default=Path(""), env="GRAPHRAG_ROOT")
+    graphrag_config: Path | None = Field(None)
+    graphrag_community_level: int = Field(2)
+    # Carpeta con los parquet para la API del grafo (por defecto, la salida del índice)
+    graph_output_dir: Path | None = Field(None)
+    # Cada cuánto se comprueba si hay un índice nuevo para recargarlo en caliente (0 lo desactiva)
+    graphrag_watch_interval: float = Field(30.0, ge=0)
+
+    # Búsquedas simultáneas por método (global y drift son mucho más caras que local)
+    search_concurrency_local: int = Field(4, ge=1)
+    search_concurrency_global: int = Field(1, ge=1)
+    search_concurrency_drift: int = Field(1, ge=1)
+    search_queue_size: int = Field(8, ge=0)
+    search_queue_timeout: float | None = Field(60.0)
+    # "thread" (por defecto) o "process": pool de procesos con el índice precargado en cada uno
+    search_executor: str = Field("thread")
+    search_processes: int | None = Field(None)
+
+    # Caché de respuestas (0 la desactiva)
+    answer_cache_size: int = Field(512, ge=0)
+    answer_cache_ttl: float | None = Field(6 * 3600)
+    # Segundo nivel por similitud de embeddings (0 lo desactiva)
+    semantic_cache_size: int = Field(1024, ge=0)
+    semantic_cache_threshold: float = Field(0.92, gt=0, le=1)
+
+    # Cliente HTTP compartido para OSDR (pool keep-alive, HTTP/2 si está instalado `h2`)
+    osdr_max_connections: int = Field(20, ge=1)
+    osdr_max_keepalive: int = Field(10, ge=0)
+    osdr_keepalive_expiry: float = Field(60.0, ge=0)
+    osdr_http2: bool = Field(True)
+    osdr_connect_timeout: float = Field(5.0, gt=0)
+    osdr_timeout: float = Field(30.0, gt=0)
+    # Reintentos con jitter, hedging tras el p95 reciente y circuit breaker
+    osdr_retries: int = Field(2, ge=0)
+    osdr_retry_backoff: float = Field(0.5, ge=0)
+    osdr_hedge: bool = Field(True)
+    osdr_hedge_min_delay: float = Field(0.5, ge=0)
+    osdr_breaker_failures: int = Field(5, ge=1)
+    osdr_breaker_reset: float = Field(30.0, gt=0)
+    # Caché en disco de respuestas de OSDR (tamaño 0 la desactiva)
+    osdr_cache_path: Path = Field(Path("data/osdr_cache.sqlite"))
+    osdr_cache_ttl: float = Field(24 * 3600, ge=0)
+    osdr_cache_max_mb: int = Field(256, ge=0)
+    # Espejo local del catálogo de assays; se vuelve a sincronizar cada intervalo (0 lo desactiva)
+    osdr_catalog_path: Path = Field(Path("data/osdr_catalog.parquet"))
+    osdr_catalog_sync_interval: float = Field(24 * 3600, ge=0)
+    # Descarga especulativa de OSDR mientras la IA extrae los filtros
+    osdr_prefetch: bool = Field(True)
+    # Recálculo en segundo plano de /gaps/options (0 lo calcula en cada petición)
+    gap_options_refresh_interval: float = Field(3600, ge=0)
+
+    # Consulta local sintética del arranque (vacía para no lanzarla)
+    warmup_query: str = Field("What are the main effects of spaceflight on living organisms?")
+    # Espera entre reintentos si falla la carga del chatbot: se dobla hasta el máximo
+    warmup_retry_backoff: float = Field(5.0, gt=0)
+    warmup_retry_max_delay: float = Field(300.0, gt=0)
 
 settings = AppSettings()
\ No newline at end of file
@@ -0,0 +1,6 @@
+from .cache import ResponseCache
+from .catalog import CatalogMirror, OsdrCatalog, get_catalog
+from .client import OsdrClient, applied_url, get_osdr
+from .resilience import CircuitBreaker, LatencyTracker
+from .client import ASSAYS_BASE, META_BASE, DATASET_BASE
+from .prefetch import Prefetch, known_organisms, start_prefetch
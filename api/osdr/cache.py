@@ -0,0 +1,202 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+def cache_key(url: str, params: List[Tuple[str, str]]) -> str:
+    """Misma clave para los mismos parámetros en cualquier orden."""
+    canonical = f"{url}?{urlencode(sorted(params))}"
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+# Trozos en los que se copia un cuerpo grande a/desde el BLOB de SQLite
+BLOB_CHUNK = 256 * 1024
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    # None si la entrada se leyó con `head` (el cuerpo se lee por trozos con `read`)
+    body: Optional[bytes]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+    size: int
+    rowid: int
+
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    def validators(self) -> Dict[str, str]:
+        """Cabeceras para revalidar con una petición condicional."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Caché en disco (SQLite) de respuestas de OSDR.
+
+    Cada entrada guarda el cuerpo tal cual llegó y sus validadores (ETag,
+    Last-Modified). Pasado el TTL la entrada no se borra: se revalida con una
+    petición condicional y, si OSDR contesta 304, se renueva sin volver a
+    descargarla. Por encima de `max_bytes` se expulsan las menos usadas (LRU).
+    """
+
+    def __init__(self, path: Path, ttl: float = 24 * 3600, max_bytes: int = 256 * 1024 * 1024):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return entry.age() < self.ttl
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        return self._lookup(key, "body")
+
+    def head(self, key: str) -> Optional[CachedResponse]:
+        """Como `get` pero sin cargar el cuerpo; se lee después con `read`."""
+        return self._lookup(key, "NULL")
+
+    def _lookup(self, key: str, body: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {body}, etag, last_modified, stored_at, size, rowid FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return CachedResponse(*row)
+
+    def read(self, key: str, entry: CachedResponse, offset: int, size: int) -> bytes:
+        """
+        Trozo `[offset, offset + size)` del cuerpo de `entry`, sin cargar el resto.
+
+        KeyError si la entrada se expulsó o se reemplazó desde que se leyó.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT rowid, size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or tuple(row) != (entry.rowid, entry.size):
+                raise KeyError(key)
+            with self._db.blobopen("responses", "body", entry.rowid, readonly=True) as blob:
+                blob.seek(offset)
+                return blob.read(size)
+
+    def put(self, key: str, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        if len(body) > self.max_bytes:
+            return
+        self._store(key, url, len(body), etag, last_modified, lambda blob: blob.write(body))
+
+    def put_file(
+        self, key: str, url: str, file: BinaryIO, size: int, etag: Optional[str], last_modified: Optional[str],
+    ) -> None:
+        """Guarda un cuerpo ya volcado a `file`, copiándolo por trozos (nunca entero en memoria)."""
+        if size > self.max_bytes:
+            return
+
+        def write(blob) -> None:
+            file.seek(0)
+            while chunk := file.read(BLOB_CHUNK):
+                blob.write(chunk)
+
+        self._store(key, url, size, etag, last_modified, write)
+
+    def _store(
+        self,
+        key: str,
+        url: str,
+        size: int,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        write: Callable[[Any], None],
+    ) -> None:
+        # Se reserva el BLOB con zeroblob y se rellena con E/S incremental, en una transacción
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                previous = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                rowid = self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, zeroblob(?), ?, ?, ?, ?, ?)",
+                    (key, url, size, etag, last_modified, now, now, size),
+                ).lastrowid
+                with self._db.blobopen("responses", "body", rowid) as blob:
+                    write(blob)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._size += size - (previous[0] if previous else 0)
+            self._evict()
+
+    def touch(self, key: str) -> None:
+        """La entrada sigue vigente (304): reinicia su TTL."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 32"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= size
+                self.evictions += 1
+                if self._size <= self.max_bytes:
+                    break
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            "entries": entries,
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
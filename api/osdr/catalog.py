@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import Request
+
+from .client import ASSAYS_BASE, OsdrClient, Params
+
+logger = logging.getLogger(__name__)
+
+# Lo que piden los routers: ids, organismo, vuelo, tecnología y la rama de características (tejido)
+SYNC_PARAMS: Params = [
+    ("format", "json.records"),
+    ("id.accession", ""),
+    ("id.assay name", ""),
+    ("investigation.study assays.study assay technology type", ""),
+    ("study.characteristics.organism", ""),
+    ("study.factor value.spaceflight", ""),
+    ("study.characteristics", ""),
+]
+
+ID_COLUMNS = ("id.accession", "id.assay name")
+
+
+class UnsupportedQuery(Exception):
+    """La consulta usa algo que el espejo local no puede evaluar; hay que ir a OSDR."""
+
+
+def parse_param(key: str, value: str) -> tuple[str, str, str]:
+    """(tipo, campo, valor) de un parámetro de la query de OSDR."""
+    if key == "format":
+        return "format", "", value
+    # Presencia: `&=campo` (gap finder) o un parámetro sin nombre con el campo como valor (assay finder)
+    if key.startswith("="):
+        return "present", key[1:], ""
+    if key == "" and value:
+        return "present", value, ""
+    if value == "":
+        return "select", key, ""
+    if len(value) >= 2 and value.startswith("/") and value.rstrip("i").endswith("/"):
+        return "regex", key, value
+    return "equals", key, value
+
+
+def parse_regex(value: str) -> re.Pattern:
+    body, flags = value[1:value.rindex("/")], value[value.rindex("/") + 1:]
+    try:
+        return re.compile(body, re.IGNORECASE if "i" in flags else 0)
+    except re.error as e:
+        raise UnsupportedQuery(f"invalid regex {value!r}: {e}")
+
+
+class OsdrCatalog:
+    """
+    Foto local del catálogo de assays de OSDR con el mismo lenguaje de consulta.
+
+    Evalúa en memoria los parámetros que construyen los routers (`_build_params`,
+    `_add_presence`): `/regex/i` busca dentro del campo, `a|b` es igualdad con
+    cualquiera de los valores, `=campo` (o un parámetro sin nombre) exige que esté
+    anotado y un campo sin valor sólo lo añade a la salida. Cada filtro es una
+    máscara vectorizada sobre la columna; las regex se evalúan una vez por valor distinto.
+    """
+
+    def __init__(self, frame: pd.DataFrame, synced_at: float):
+        self.frame = frame.reset_index(drop=True)
+        self.synced_at = synced_at
+        self.columns = list(self.frame.columns)
+        self._present = {c: pd.notna(self.frame[c]).to_numpy() for c in self.columns}
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]], synced_at: Optional[float] = None) -> "OsdrCatalog":
+        frame = pd.DataFrame.from_records(records)
+        for column in frame.columns:
+            frame[column] = frame[column].map(lambda v: None if v is None or v != v else str(v))
+        return cls(frame, synced_at or time.time())
+
+    @classmethod
+    def load(cls, path: Path) -> "OsdrCatalog":
+        table = pq.read_table(path)
+        metadata = table.schema.metadata or {}
+        return cls(table.to_pandas(), float(metadata.get(b"synced_at", b"0")))
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(self.frame, preserve_index=False)
+        table = table.replace_schema_metadata({"synced_at": str(self.synced_at)})
+        tmp = path.with_suffix(".tmp")
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def query(self, params: Params) -> List[Dict[str, Any]]:
+        mask = np.ones(len(self.frame), dtype=bool)
+        output: set[str] = set(ID_COLUMNS)
+
+        for key, value in params:
+            kind, field, value = parse_param(key, value)
+            if kind == "format":
+                if value != "json.records":
+                    raise UnsupportedQuery(f"format {value!r}")
+                continue
+            if kind != "select" and field not in self._present:
+                raise UnsupportedQuery(f"field {field!r} not in the local catalog")
+            output.add(field)
+
+            if kind == "present":
+                mask &= self._present[field]
+            elif kind == "equals":
+                mask &= self.frame[field].isin(value.split("|")).to_numpy()
+            elif kind == "regex":
+                mask &= self._match(field, parse_regex(value))
+
+        # Un campo de salida incluye su rama (p. ej. "study.characteristics" -> todas sus columnas)
+        columns = [c for c in self.columns if any(c == f or c.startswith(f + ".") for f in output)]
+        rows = self.frame.loc[mask, columns]
+        # Todos los valores son texto; lo demás son huecos (None/NaN)
+        return [{k: v for k, v in row.items() if isinstance(v, str)} for row in rows.to_dict("records")]
+
+    def _match(self, field: str, pattern: re.Pattern) -> np.ndarray:
+        codes, uniques = pd.factorize(self.frame[field])
+        hits = np.array([bool(pattern.search(u)) for u in uniques] + [False], dtype=bool)
+        # factorize marca los nulos con -1, que cae en el False añadido al final
+        return hits[codes]
+
+
+class CatalogMirror:
+    """
+    Mantiene el espejo local del catálogo: lo carga del disco al arrancar y lo
+    vuelve a descargar de OSDR en segundo plano cada `interval` segundos.
+    """
+
+    def __init__(self, osdr: OsdrClient, path: Path, interval: float = 24 * 3600):
+        self.osdr = osdr
+        self.path = Path(path)
+        self.interval = interval
+        self.catalog: Optional[OsdrCatalog] = None
+        # Primera foto disponible (del disco o de la primera sincronización, aunque falle)
+        self._ready = asyncio.Event()
+        self._next_sync = 0.0
+        self.last_error: Optional[str] = None
+        self.served = 0
+        self.fallbacks = 0
+
+    async def run(self) -> None:
+        if self.path.exists():
+            try:
+                self.catalog = await asyncio.to_thread(OsdrCatalog.load, self.path)
+                self._next_sync = self.catalog.synced_at + self.interval
+                logger.info("OSDR catalog loaded from disk (%d rows)", len(self.catalog))
+                self._ready.set()
+            except Exception:
+                logger.exception("Could not read the OSDR catalog at %s", self.path)
+
+        while True:
+            delay = self._next_sync - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.sync()
+            self._ready.set()
+
+    async def wait_ready(self) -> None:
+        """Espera al primer intento de tener foto; después `query` decide si se usa."""
+        await self._ready.wait()
+
+    async def sync(self) -> None:
+        try:
+            start = time.perf_counter()
+            records = [r async for r in self.osdr.iter_records(ASSAYS_BASE, SYNC_PARAMS, timeout=120.0, hedge=False)]
+            catalog = await asyncio.to_thread(OsdrCatalog.from_records, records)
+            await asyncio.to_thread(catalog.save, self.path)
+            self.catalog = catalog
+            self._next_sync = time.time() + self.interval
+            self.last_error = None
+            logger.info("OSDR catalog synced: %d rows in %.1f s", len(catalog), time.perf_counter() - start)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Seguimos con la foto anterior; se reintenta en el siguiente ciclo
+            logger.warning("OSDR catalog sync failed: %s", e)
+            self.last_error = str(e)
+            self._next_sync = time.time() + min(self.interval, 300)
+
+    def query(self, params: Params) -> Optional[List[Dict[str, Any]]]:
+        """Filas de la foto local, o None si no hay foto o la consulta no es evaluable."""
+        catalog = self.catalog
+        if catalog is None:
+            return None
+        try:
+            rows = catalog.query(params)
+        except UnsupportedQuery as e:
+            logger.info("OSDR query not served locally: %s", e)
+            self.fallbacks += 1
+            return None
+        self.served += 1
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        catalog = self.catalog
+        return {
+            "rows": len(catalog) if catalog is not None else 0,
+            "synced_at": catalog.synced_at if catalog is not None else None,
+            "served": self.served,
+            "fallbacks": self.fallbacks,
+            "last_error": self.last_error,
+        }
+
+
+def get_catalog(request: Request) -> Optional[CatalogMirror]:
+    return getattr(request.app.state, "osdr_catalog", None)
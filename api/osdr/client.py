@@ -0,0 +1,434 @@
+import asyncio
+import json
+import logging
+import math
+import random
+import tempfile
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException, Request
+
+from .cache import CachedResponse, ResponseCache, cache_key
+from .records import RecordStream
+from .resilience import CircuitBreaker, LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+OSDR_HOST = "https://visualization.osdr.nasa.gov"
+ASSAYS_BASE = f"{OSDR_HOST}/biodata/api/v2/query/assays/"
+META_BASE = f"{OSDR_HOST}/biodata/api/v2/query/metadata/"
+DATASET_BASE = f"{OSDR_HOST}/biodata/api/v2/dataset"
+
+Params = List[Tuple[str, str]]
+
+# Trozos en los que se relee una respuesta cacheada al iterar sus registros
+CHUNK_SIZE = 64 * 1024
+# Bytes acumulados en memoria antes de volcarlos al fichero temporal desde un hilo
+SPOOL_FLUSH_SIZE = 1024 * 1024
+
+
+def applied_url(base: str, params: Params) -> str:
+    """URL final de la consulta (para devolverla a la UI); no necesita cliente."""
+    return str(httpx.Request("GET", base, params=params).url)
+
+
+class OsdrClient:
+    """
+    Cliente HTTP único para OSDR, creado en el lifespan y compartido por los routers.
+
+    Mantiene un pool de conexiones keep-alive (y HTTP/2 si está `h2`), así que las
+    búsquedas reutilizan la conexión TLS en lugar de negociar una nueva cada vez.
+    El timeout se puede fijar por llamada. Con `cache`, las respuestas se sirven
+    desde disco mientras estén vigentes y se revalidan (ETag/Last-Modified) al caducar.
+
+    Cada GET se reintenta (`retries`, backoff exponencial con jitter) ante errores de
+    red, 5xx y 429, siempre dentro del timeout de la llamada: es un plazo total, cada
+    intento recibe sólo lo que queda y no se empieza otro si ya no queda nada. Si un
+    intento tarda más que el p95 reciente se lanza un segundo en paralelo (hedging) y
+    gana el primero que responda. Tras varios fallos seguidos
+    el circuit breaker corta las llamadas un tiempo: se sirve la copia caducada de la
+    caché si la hay y, si no, 503 sin esperar al timeout.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        http2: bool = True,
+        connect_timeout: float = 5.0,
+        timeout: float = 30.0,
+        cache: Optional[ResponseCache] = None,
+        retries: int = 2,
+        retry_backoff: float = 0.5,
+        hedge: bool = True,
+        hedge_min_delay: float = 0.5,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.cache = cache
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        # Últimos intentos (para /api/v1/osdr/stats)
+        self.attempts: deque[Dict[str, Any]] = deque(maxlen=100)
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.stale_served = 0
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("Package 'h2' not installed; OSDR client falls back to HTTP/1.1")
+                http2 = False
+
+        self.http = httpx.AsyncClient(
+            http2=http2,
+            follow_redirects=True,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+
+    async def get_json(self, url: str, params: Params, timeout: Optional[float] = None, hedge: bool = True) -> Any:
+        body = await self.get_bytes(url, params, timeout, hedge)
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise HTTPException(status_code=502, detail=f"Respuesta OSDR no es JSON: {e}")
+
+    async def get_bytes(self, url: str, params: Params, timeout: Optional[float] = None, hedge: bool = True) -> bytes:
+        if self.cache is None:
+            r = await self._get(url, params, timeout, hedge)
+            self._raise_for_status(r)
+            return r.content
+
+        key = cache_key(url, params)
+        entry = await asyncio.to_thread(self.cache.get, key)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.hits += 1
+            return entry.body
+
+        try:
+            r = await self._get(url, params, timeout, hedge, entry.validators() if entry is not None else None)
+        except HTTPException as e:
+            if entry is None:
+                raise
+            # OSDR caído o lento: mejor la copia caducada que un error
+            logger.warning("OSDR unavailable (%s); serving a stale cached response", e.detail)
+            self.stale_served += 1
+            return entry.body
+
+        if r.status_code == 304 and entry is not None:
+            self.cache.revalidated += 1
+            await asyncio.to_thread(self.cache.touch, key)
+            return entry.body
+
+        self._raise_for_status(r)
+        self.cache.misses += 1
+        await asyncio.to_thread(
+            self.cache.put, key, str(r.url), r.content, r.headers.get("etag"), r.headers.get("last-modified"),
+        )
+        return r.content
+
+    async def iter_records(
+        self,
+        url: str,
+        params: Params,
+        timeout: Optional[float] = None,
+        hedge: bool = True,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Registros de una consulta `json.records` según se van descargando.
+
+        Mismos reintentos, caché y circuit breaker que `get_bytes`, pero el cuerpo se
+        parsea por trozos: el llamador puede ir agregando cada fila sin tener la lista
+        completa en memoria. Para la caché, los trozos se vuelcan a un fichero temporal
+        en bloques de `SPOOL_FLUSH_SIZE`, desde un hilo, y después se copian al BLOB; una entrada cacheada se relee igual,
+        por trozos, sin cargar el cuerpo entero.
+        """
+        entry: Optional[CachedResponse] = None
+        key = None
+        if self.cache is not None:
+            key = cache_key(url, params)
+            entry = await asyncio.to_thread(self.cache.head, key)
+            if entry is not None and self.cache.is_fresh(entry):
+                self.cache.hits += 1
+                async for record in self._cached_records(key, entry):
+                    yield record
+                return
+
+        try:
+            r = await self._get(url, params, timeout, hedge, entry.validators() if entry is not None else None, stream=True)
+        except HTTPException as e:
+            if entry is None:
+                raise
+            logger.warning("OSDR unavailable (%s); serving a stale cached response", e.detail)
+            self.stale_served += 1
+            async for record in self._cached_records(key, entry):
+                yield record
+            return
+
+        if r.status_code == 304 and entry is not None:
+            self.cache.revalidated += 1
+            await asyncio.to_thread(self.cache.touch, key)
+            async for record in self._cached_records(key, entry):
+                yield record
+            return
+
+        self._raise_for_status(r)
+        spool = None
+        if self.cache is not None:
+            spool = await asyncio.to_thread(tempfile.TemporaryFile, dir=self.cache.path.parent)
+        # Las escrituras al disco no se hacen en el event loop: se agrupan y se vuelcan en un hilo
+        pending: List[bytes] = []
+        pending_size = size = 0
+        parser = RecordStream()
+        try:
+            # El breaker se actualiza al terminar el cuerpo: una conexión que se corta tras
+            # las cabeceras también cuenta como fallo
+            try:
+                async for chunk in r.aiter_bytes():
+                    if spool is not None:
+                        size += len(chunk)
+                        if size > self.cache.max_bytes:
+                            spool.close()
+                            spool = None
+                            pending.clear()
+                        else:
+                            pending.append(chunk)
+                            pending_size += len(chunk)
+                            if pending_size >= SPOOL_FLUSH_SIZE:
+                                await asyncio.to_thread(spool.writelines, pending)
+                                pending, pending_size = [], 0
+                    for record in self._parse(parser, chunk):
+                        yield record
+                self._parse(parser, None)
+            except httpx.HTTPError as e:
+                self.breaker.record_failure()
+                raise HTTPException(status_code=502, detail=f"Error consultando OSDR: {e}")
+            except BaseException:
+                self.breaker.abandon()
+                raise
+            else:
+                self.breaker.record_success()
+            finally:
+                await r.aclose()
+
+            if spool is not None:
+                self.cache.misses += 1
+                await asyncio.to_thread(spool.writelines, pending)
+                await asyncio.to_thread(
+                    self.cache.put_file, key, str(r.url), spool, size, r.headers.get("etag"), r.headers.get("last-modified"),
+                )
+        finally:
+            if spool is not None:
+                spool.close()
+
+    async def _cached_records(self, key: str, entry: CachedResponse) -> AsyncIterator[Dict[str, Any]]:
+        parser = RecordStream()
+        for offset in range(0, entry.size, CHUNK_SIZE):
+            try:
+                chunk = await asyncio.to_thread(self.cache.read, key, entry, offset, CHUNK_SIZE)
+            except KeyError:
+                raise HTTPException(status_code=502, detail="Respuesta OSDR cacheada expulsada durante la lectura")
+            for record in self._parse(parser, chunk):
+                yield record
+        self._parse(parser, None)
+
+    @staticmethod
+    def _parse(parser: RecordStream, chunk: Optional[bytes]) -> List[Dict[str, Any]]:
+        try:
+            if chunk is None:
+                parser.close()
+                return []
+            return parser.feed(chunk)
+        except ValueError as e:
+            raise HTTPException(status_code=502, detail=f"Respuesta OSDR no es json.records: {e}")
+
+    async def _get(
+        self,
+        url: str,
+        params: Params,
+        timeout: Optional[float],
+        hedge: bool = True,
+        headers: Optional[Dict[str, str]] = None,
+        stream: bool = False,
+    ) -> httpx.Response:
+        """
+        Respuesta < 500 de OSDR, o HTTPException 502/503 cuando no se pudo obtener.
+
+        Con `stream`, un 200 vuelve sin leer el cuerpo y el llamador debe cerrarlo y
+        anotar en el breaker el resultado de la lectura.
+        """
+        if not self.breaker.allow():
+            raise HTTPException(
+                status_code=503,
+                detail="OSDR no disponible temporalmente.",
+                headers={"Retry-After": str(math.ceil(self.breaker.retry_after()) or 1)},
+            )
+
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        error = None
+        attempts = 0
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    # Full jitter: los clientes que fallaron a la vez no reintentan a la vez
+                    backoff = random.uniform(0, self.retry_backoff * 2 ** (attempt - 1))
+                    if time.monotonic() + backoff >= deadline:
+                        break
+                    self.retried += 1
+                    await asyncio.sleep(backoff)
+                attempts += 1
+                try:
+                    r = await self._hedged(url, params, deadline, headers, attempt, hedge, stream)
+                except httpx.HTTPError as e:
+                    error = f"{type(e).__name__}: {e}"
+                    continue
+                if r.status_code >= 500 or r.status_code == 429:
+                    error = f"HTTP {r.status_code}"
+                    continue
+                if not stream or r.status_code != 200:
+                    self.breaker.record_success()
+                return r
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+
+        self.breaker.record_failure()
+        logger.error("Error fetching %s after %d attempts: %s", url, attempts, error)
+        raise HTTPException(status_code=502, detail=f"Error consultando OSDR: {error}")
+
+    async def _hedged(
+        self,
+        url: str,
+        params: Params,
+        deadline: float,
+        headers: Optional[Dict[str, str]],
+        attempt: int,
+        hedge: bool,
+        stream: bool,
+    ) -> httpx.Response:
+        primary = asyncio.ensure_future(self._attempt(url, params, deadline, headers, attempt, False, stream))
+        delay = self.latency.percentile(95) if hedge and self.hedge else None
+        if delay is None:
+            return await primary
+
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=max(delay, self.hedge_min_delay))
+            if done:
+                return primary.result()
+
+            self.hedged += 1
+            pending.add(asyncio.ensure_future(self._attempt(url, params, deadline, headers, attempt, True, stream)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((t for t in done if t.exception() is None and t.result().status_code < 500), None)
+                if winner is not None:
+                    for task in done - {winner}:
+                        _discard(task)
+                    if winner is not primary:
+                        self.hedge_wins += 1
+                    return winner.result()
+            # Los dos fallaron: el resultado del primero decide (reintento o error)
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+                task.add_done_callback(_discard)
+
+    async def _attempt(
+        self,
+        url: str,
+        params: Params,
+        deadline: float,
+        headers: Optional[Dict[str, str]],
+        attempt: int,
+        hedge: bool,
+        stream: bool = False,
+    ) -> httpx.Response:
+        start = time.perf_counter()
+        status, error = None, None
+        # Lo que queda del plazo de la llamada, no el timeout completo en cada intento
+        remaining = max(deadline - time.monotonic(), 0.001)
+        try:
+            request = self.http.build_request(
+                "GET",
+                url,
+                params=params,
+                headers=headers,
+                timeout=httpx.Timeout(remaining, connect=min(self.http.timeout.connect or remaining, remaining)),
+            )
+            r = await self.http.send(request, stream=True)
+            try:
+                # Los errores y las llamadas normales se leen enteros; sólo un 200 en streaming queda abierto
+                if not stream or r.status_code != 200:
+                    await r.aread()
+            except BaseException:
+                await r.aclose()
+                raise
+            status = r.status_code
+            return r
+        except asyncio.CancelledError:
+            error = "cancelled"
+            raise
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            if status is not None and status < 500:
+                self.latency.add(elapsed)
+            self.attempts.append({
+                "url": httpx.URL(url).path,
+                "attempt": attempt,
+                "hedge": hedge,
+                "status": status,
+                "error": error,
+                "ms": round(1000 * elapsed, 1),
+                "at": time.time(),
+            })
+
+    @staticmethod
+    def _raise_for_status(r: httpx.Response) -> None:
+        if r.status_code >= 400:
+            raise HTTPException(status_code=r.status_code, detail=f"OSDR error: {r.text}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency.stats(),
+            "breaker": self.breaker.stats(),
+            "retries": self.retried,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "stale_served": self.stale_served,
+            "attempts": list(self.attempts)[-20:],
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+        if self.cache is not None:
+            self.cache.close()
+
+
+def _discard(task: asyncio.Future) -> None:
+    """Cierra la respuesta de un intento que no se usó (el perdedor del hedging)."""
+    if not task.cancelled() and task.exception() is None:
+        asyncio.ensure_future(task.result().aclose())
+
+
+def get_osdr(request: Request) -> OsdrClient:
+    return request.app.state.osdr
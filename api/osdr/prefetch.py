@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import Request
+
+from ..utils import SingleFlight
+from .catalog import OsdrCatalog, UnsupportedQuery, get_catalog, parse_param, parse_regex
+from .client import ASSAYS_BASE, OsdrClient, Params, get_osdr
+
+logger = logging.getLogger(__name__)
+
+ORGANISM_FIELD = "study.characteristics.organism"
+SPACEFLIGHT_FIELD = "study.factor value.spaceflight"
+# Columnas que usan los dos routers para construir tarjetas y gaps
+SUPERSET_FIELDS = (
+    "id.accession",
+    "id.assay name",
+    "investigation.study assays.study assay technology type",
+    ORGANISM_FIELD,
+    SPACEFLIGHT_FIELD,
+)
+
+# Palabras de la consulta -> nombre del organismo tal como aparece en OSDR
+ORGANISM_KEYWORDS = {
+    "Mus musculus": ("mouse", "mice", "murine", "mus musculus"),
+    "Rattus norvegicus": ("rat", "rats", "rattus"),
+    "Homo sapiens": ("human", "humans", "astronaut", "astronauts", "homo sapiens"),
+    "Arabidopsis thaliana": ("arabidopsis", "thale cress"),
+    "Drosophila melanogaster": ("drosophila", "fruit fly", "fruit flies"),
+    "Caenorhabditis elegans": ("c. elegans", "c elegans", "caenorhabditis", "nematode", "nematodes"),
+    "Saccharomyces cerevisiae": ("yeast", "saccharomyces"),
+    "Danio rerio": ("zebrafish", "danio rerio"),
+    "Escherichia coli": ("e. coli", "e coli", "escherichia"),
+}
+_KEYWORD_RES = {
+    organism: re.compile(r"\b(" + "|".join(re.escape(k) for k in keywords) + r")\b", re.IGNORECASE)
+    for organism, keywords in ORGANISM_KEYWORDS.items()
+}
+
+_flights = SingleFlight()
+
+
+def detect_organisms(text: Optional[str]) -> List[str]:
+    """Organismos nombrados en la consulta, sin IA (sólo palabras clave)."""
+    return [organism for organism, pattern in _KEYWORD_RES.items() if text and pattern.search(text)]
+
+
+def superset_params(organisms: List[str], characteristics: bool = False, require_spaceflight: bool = False) -> Params:
+    params: Params = [("format", "json.records")]
+    if organisms:
+        params.append((ORGANISM_FIELD, "|".join(organisms)))
+    if require_spaceflight:
+        params.append((f"={SPACEFLIGHT_FIELD}", ""))
+    params.extend((field, "") for field in SUPERSET_FIELDS)
+    if characteristics:
+        params.append(("study.characteristics", ""))
+    return params
+
+
+def known_organisms(state: Any) -> Optional[List[str]]:
+    """Organismos del catálogo (índice de facetas de /gaps/options), si ya está calculado."""
+    facets = getattr(state, "gap_facets", None)
+    snapshot = facets.snapshot if facets is not None else None
+    return snapshot.options.get("organisms") if snapshot is not None else None
+
+
+class Prefetch:
+    """
+    Consulta amplia a OSDR lanzada mientras la IA extrae los filtros.
+
+    Sólo se lanza si la consulta nombra organismos, y pide sólo sus assays: sin
+    organismo el superconjunto sería el catálogo entero, más lento de descargar que
+    la consulta exacta que casi siempre hará falta igualmente. Cuando llegan los filtros, `query` los
+    evalúa en local sobre ese superconjunto (mismo motor que el espejo del catálogo)
+    y devuelve None si no puede garantizar el mismo resultado que OSDR; entonces
+    el router hace la consulta exacta de siempre.
+    """
+
+    def __init__(self, osdr: OsdrClient, organisms: List[str], params: Params, timeout: float = 30.0):
+        self.organisms = organisms
+        key = ("prefetch", tuple(params))
+        self.task = asyncio.ensure_future(_flights.do(key, lambda: self._load(osdr, params, timeout)))
+        # Si nadie llega a esperarla (la IA falló), que el error no quede sin recoger
+        self.task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    @classmethod
+    def start(cls, osdr: OsdrClient, text: Optional[str], **superset) -> Optional["Prefetch"]:
+        organisms = detect_organisms(text)
+        if not organisms:
+            return None
+        return cls(osdr, organisms, superset_params(organisms, **superset))
+
+    @staticmethod
+    async def _load(osdr: OsdrClient, params: Params, timeout: float) -> OsdrCatalog:
+        records = [r async for r in osdr.iter_records(ASSAYS_BASE, params, timeout=timeout)]
+        return await asyncio.to_thread(OsdrCatalog.from_records, records)
+
+    def covers(self, params: Params, organisms_universe: Optional[Iterable[str]] = None) -> bool:
+        """¿Está todo lo que devolvería OSDR para `params` dentro del superconjunto?"""
+        for key, value in params:
+            kind, field, value = parse_param(key, value)
+            if field != ORGANISM_FIELD or kind not in ("equals", "regex"):
+                continue
+            if kind == "equals":
+                return set(value.split("|")) <= set(self.organisms)
+            # Una regex sólo se puede acotar conociendo todos los organismos del catálogo
+            if organisms_universe is None:
+                return False
+            try:
+                pattern = parse_regex(value)
+            except UnsupportedQuery:
+                return False
+            return all(o in self.organisms for o in organisms_universe if pattern.search(o))
+        # Sin filtro de organismo el resultado incluye todos: el superconjunto no basta
+        return False
+
+    async def query(self, params: Params, organisms_universe: Optional[Iterable[str]] = None) -> Optional[List[Dict[str, Any]]]:
+        if not self.covers(params, organisms_universe):
+            logger.info("Prefetch for %s does not cover the final filters", self.organisms or "all organisms")
+            self.cancel()
+            return None
+        try:
+            catalog = await self.task
+            return await asyncio.to_thread(catalog.query, params)
+        except UnsupportedQuery as e:
+            logger.info("Prefetched rows cannot answer the query: %s", e)
+        except Exception as e:
+            # La consulta exacta dará el error real si OSDR sigue fallando
+            logger.warning("OSDR prefetch failed: %s", e)
+        return None
+
+    def cancel(self) -> None:
+        self.task.cancel()
+
+
+def start_prefetch(request: Request, text: Optional[str], **superset) -> Optional[Prefetch]:
+    """
+    Lanza el prefetch salvo que esté desactivado, el espejo local ya responda al
+    instante o la consulta no nombre ningún organismo.
+    """
+    settings = getattr(request.app.state, "settings", None)
+    if settings is not None and not settings.osdr_prefetch:
+        return None
+    mirror = get_catalog(request)
+    if mirror is not None and mirror.catalog is not None:
+        return None
+    return Prefetch.start(get_osdr(request), text, **superset)
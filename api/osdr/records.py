@@ -0,0 +1,64 @@
+import codecs
+import json
+import re
+from typing import Any, Dict, List
+
+_SPACE_RE = re.compile(r"\s*")
+
+
+class RecordStream:
+    """
+    Parser incremental de una respuesta `json.records` (un array JSON de objetos).
+
+    Se le pasan los bytes según llegan (`feed`) y devuelve los registros que ya
+    están completos; lo que queda a medias se guarda hasta el siguiente trozo. Así
+    nunca están en memoria a la vez el cuerpo entero, su texto y la lista de dicts.
+    """
+
+    def __init__(self):
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._done = False
+
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        self._buffer = self._buffer[self._pos:] + self._text.decode(chunk)
+        self._pos = 0
+        records = []
+        buffer = self._buffer
+
+        while not self._done:
+            pos = _SPACE_RE.match(buffer, self._pos).end()
+            if pos >= len(buffer):
+                break
+            char = buffer[pos]
+            if not self._started:
+                if char != "[":
+                    raise ValueError("OSDR response is not json.records (a JSON array)")
+                self._started = True
+                self._pos = pos + 1
+            elif char == "]":
+                self._done = True
+                self._pos = pos + 1
+            elif char == ",":
+                self._pos = pos + 1
+            else:
+                try:
+                    record, end = self._decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # Registro incompleto: esperamos al siguiente trozo
+                    break
+                if not isinstance(record, dict):
+                    raise ValueError("OSDR json.records item is not an object")
+                records.append(record)
+                self._pos = end
+
+        return records
+
+    def close(self) -> None:
+        """Comprueba que el array terminó (no es una respuesta cortada o inválida)."""
+        self.feed(self._text.decode(b"", final=True).encode())
+        if not self._done:
+            raise ValueError("Truncated or invalid json.records response from OSDR")
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, Request
+
+from .catalog import get_catalog
+from .client import OsdrClient, get_osdr
+
+router = APIRouter()
+
+
+@router.get("/stats")
+def osdr_stats(request: Request, osdr: OsdrClient = Depends(get_osdr)):
+    mirror = get_catalog(request)
+    facets = getattr(request.app.state, "gap_facets", None)
+    return {
+        **osdr.stats(),
+        "catalog": mirror.stats() if mirror is not None else None,
+        "gap_options": facets.stats() if facets is not None else None,
+    }
@@ -0,0 +1,46 @@
+"""
+Vuelve a grabar `fixtures/osdr_assays.json` contra la API real de OSDR.
+
+    python -m api.tests.record_osdr_fixture
+
+Mantiene las accesiones y los casos (router + argumentos) del fixture: descarga la
+foto del catálogo (`SYNC_PARAMS`) de esas accesiones y, para cada caso, la respuesta
+de OSDR a los parámetros que construye hoy el router, quedándose con las filas de
+esas accesiones (los filtros son por fila, así que el recorte no cambia el resultado).
+El fixture del repositorio es sintético (`source` lo indica); al grabarlo, `source`
+pasa a ser la URL de la API.
+"""
+import json
+from pathlib import Path
+
+import httpx
+
+from ..osdr.catalog import SYNC_PARAMS
+from ..osdr.client import ASSAYS_BASE
+from .test_osdr_catalog import BUILDERS
+
+PATH = Path(__file__).parent / "fixtures" / "osdr_assays.json"
+
+
+def fetch(http: httpx.Client, params, accessions):
+    r = http.get(ASSAYS_BASE, params=params)
+    r.raise_for_status()
+    return [row for row in r.json() if row.get("id.accession") in accessions]
+
+
+def main() -> None:
+    fixture = json.loads(PATH.read_text())
+    accessions = set(fixture["accessions"])
+    with httpx.Client(timeout=300.0, follow_redirects=True) as http:
+        fixture["source"] = ASSAYS_BASE
+        fixture["catalog"] = fetch(http, SYNC_PARAMS, accessions)
+        for case in fixture["cases"]:
+            params = BUILDERS[case["builder"]](**case["args"])
+            case["params"] = [list(p) for p in params]
+            case["records"] = fetch(http, params, accessions)
+            print(f"{case['builder']} {case['args']}: {len(case['records'])} rows")
+    PATH.write_text(json.dumps(fixture, indent=1, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import types
+
+import numpy as np
+import pytest
+
+from api.graphbot.graph import layout
+
+
+def _communities(n: int, size: int, seed: int = 0) -> types.SimpleNamespace:
+    # Grafo con comunidades densas: las que tienden a apilarse dentro de una celda
+    rng = np.random.default_rng(seed)
+    source = rng.integers(0, n, 8 * n)
+    target = (source // size * size + rng.integers(0, size, len(source))) % n
+    return types.SimpleNamespace(
+        node_count=n, edge_count=len(source), edge_source=source, edge_target=target,
+        edge_weights=np.ones(len(source)),
+    )
+
+
+def _nearest_distances(positions: np.ndarray) -> np.ndarray:
+    distance = np.sqrt(((positions[:, None] - positions[None]) ** 2).sum(axis=-1))
+    np.fill_diagonal(distance, np.inf)
+    return distance.min(axis=1)
+
+
+@pytest.fixture(scope="module")
+def index() -> types.SimpleNamespace:
+    return _communities(1200, 60)
+
+
+def test_grid_layout_keeps_the_spread_of_the_exact_one(index, monkeypatch):
+    monkeypatch.setattr(layout, "EXACT_MAX_NODES", 10 ** 6)
+    exact = _nearest_distances(layout.force_layout(index, iterations=30))
+    monkeypatch.setattr(layout, "EXACT_MAX_NODES", 100)
+    grid = _nearest_distances(layout.force_layout(index, iterations=30))
+
+    assert not np.isnan(grid).any()
+    assert np.median(grid) >= 0.95 * np.median(exact)
+    assert np.mean(grid < 1e-6) == 0
+
+
+def test_block_size_does_not_change_the_result(index, monkeypatch):
+    monkeypatch.setattr(layout, "EXACT_MAX_NODES", 100)
+    small = layout.force_layout(index, iterations=3, memory_budget=64 * 1024)
+    large = layout.force_layout(index, iterations=3)
+    np.testing.assert_allclose(small, large, atol=1e-9)
@@ -0,0 +1,39 @@
+import pytest
+
+from api.graphbot.chats.chatbot.method_router import MethodRouter
+
+
+@pytest.fixture(scope="module")
+def router() -> MethodRouter:
+    return MethodRouter(
+        ["microgravity", "bone loss", "mice", "muscle atrophy", "rats", "spaceflight"],
+        generic_titles=["spaceflight"],
+    )
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "How does microgravity affect bone loss in mice?",
+        "How do mice and rats interact with microgravity?",
+        "Is muscle atrophy connected to bone loss?",
+    ],
+)
+def test_entity_questions_go_to_local(router, query):
+    assert router.route(query).method == "local"
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "Compare bone loss in mice and rats",
+        "What are the differences between muscle atrophy and bone loss?",
+        "Bone loss in mice vs rats",
+    ],
+)
+def test_explicit_comparisons_go_to_drift(router, query):
+    assert router.route(query).method == "drift"
+
+
+def test_broad_questions_go_to_global(router):
+    assert router.route("Give me an overview of spaceflight research").method == "global"
@@ -0,0 +1,75 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from api.assay_finder.router import _build_params
+from api.gap_finder.router import _build_gap_params, _options_params
+from api.osdr.catalog import CatalogMirror, OsdrCatalog, UnsupportedQuery
+
+FIXTURE = json.loads((Path(__file__).parent / "fixtures" / "osdr_assays.json").read_text())
+
+BUILDERS = {
+    "assay_finder": _build_params,
+    "gap_finder": _build_gap_params,
+    "gap_options": _options_params,
+}
+
+
+def _canonical(rows):
+    # OSDR no garantiza orden: se comparan como multiconjunto de filas
+    return sorted(json.dumps(row, sort_keys=True) for row in rows)
+
+
+@pytest.fixture(scope="module")
+def catalog() -> OsdrCatalog:
+    return OsdrCatalog.from_records(FIXTURE["catalog"])
+
+
+@pytest.mark.parametrize(
+    "case", FIXTURE["cases"], ids=[f"{c['builder']}-{i}" for i, c in enumerate(FIXTURE["cases"])],
+)
+def test_query_matches_osdr(catalog, case):
+    params = BUILDERS[case["builder"]](**case["args"])
+    # Si cambian los parámetros de un router hay que volver a grabar la respuesta de OSDR
+    assert [list(p) for p in params] == case["params"]
+    assert _canonical(catalog.query(params)) == _canonical(case["records"])
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        [("format", "json")],
+        [("format", "json.records"), ("study.characteristics.diet", "Standard chow")],
+        [("format", "json.records"), ("=study.factor value.radiation", "")],
+        [("format", "json.records"), ("study.characteristics.organism", "/mus(/i")],
+    ],
+    ids=["format", "unknown-filter", "unknown-presence", "bad-regex"],
+)
+def test_unsupported_queries(catalog, params):
+    with pytest.raises(UnsupportedQuery):
+        catalog.query(params)
+
+
+def test_unknown_output_field_is_only_a_selector(catalog):
+    rows = catalog.query([("format", "json.records"), ("id.accession", "OSD-37"), ("study.characteristics.diet", "")])
+    assert {row["id.accession"] for row in rows} == {"OSD-37"}
+
+
+def test_mirror_falls_back_to_osdr(tmp_path, catalog):
+    mirror = CatalogMirror(osdr=None, path=tmp_path / "catalog.parquet")
+    assert mirror.query(_options_params()) is None
+
+    mirror.catalog = catalog
+    assert mirror.query([("format", "json")]) is None
+    assert mirror.fallbacks == 1
+    assert mirror.query(_options_params()) is not None
+    assert mirror.served == 1
+
+
+def test_catalog_survives_parquet_round_trip(tmp_path, catalog):
+    path = tmp_path / "catalog.parquet"
+    catalog.save(path)
+    loaded = OsdrCatalog.load(path)
+    params = _build_gap_params(["Mus musculus"], [], None)
+    assert _canonical(loaded.query(params)) == _canonical(catalog.query(params))
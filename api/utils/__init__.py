@@ -0,0 +1,2 @@
+from .singleflight import SingleFlight
+from .result_store import CursorError, ResultStore
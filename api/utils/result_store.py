@@ -0,0 +1,102 @@
+import base64
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class CursorError(Exception):
+    """Cursor mal formado (400) o cuyo resultado ya caducó (410)."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class ResultSet:
+    items: List[Any]
+    meta: Dict[str, Any] = field(default_factory=dict)
+    expires_at: float = 0.0
+
+
+def encode_cursor(handle: str, offset: int, page_size: int) -> str:
+    return base64.urlsafe_b64encode(f"{handle}:{offset}:{page_size}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        handle, offset, page_size = raw.split(":")
+        offset, page_size = int(offset), int(page_size)
+    except Exception:
+        raise CursorError("Invalid cursor.")
+    if offset < 0 or page_size < 1:
+        raise CursorError("Invalid cursor.")
+    return handle, offset, page_size
+
+
+class ResultStore:
+    """
+    Resultados ya calculados, guardados un rato para paginarlos con cursores.
+
+    La primera página se sirve al calcular; el resto del listado queda bajo un
+    handle aleatorio (LRU, `max_entries`) que caduca tras `ttl` segundos sin uso.
+    El cursor lleva el handle, la posición y el tamaño de página, así que las
+    páginas siguientes son un simple corte de la lista, sin repetir la búsqueda.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._results: "OrderedDict[str, ResultSet]" = OrderedDict()
+
+    def first_page(
+        self,
+        items: List[Any],
+        page_size: Optional[int],
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Any], Optional[str]]:
+        """(primera página, cursor de la siguiente o None si cabe todo)."""
+        if page_size is None or len(items) <= page_size:
+            return items, None
+        handle = self._put(ResultSet(items, meta or {}))
+        return items[:page_size], encode_cursor(handle, page_size, page_size)
+
+    def next_page(self, cursor: str, page_size: Optional[int] = None) -> Tuple[ResultSet, List[Any], Optional[str]]:
+        handle, offset, cursor_page_size = decode_cursor(cursor)
+        page_size = page_size or cursor_page_size
+        result = self._get(handle)
+        if result is None:
+            raise CursorError("Cursor expired; repeat the search.", status_code=410)
+
+        end = offset + page_size
+        next_cursor = encode_cursor(handle, end, page_size) if end < len(result.items) else None
+        return result, result.items[offset:end], next_cursor
+
+    def _put(self, result: ResultSet) -> str:
+        self._expire()
+        handle = secrets.token_urlsafe(12)
+        result.expires_at = time.monotonic() + self.ttl
+        self._results[handle] = result
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        return handle
+
+    def _get(self, handle: str) -> Optional[ResultSet]:
+        self._expire()
+        result = self._results.get(handle)
+        if result is not None:
+            # TTL deslizante: mientras se pagina, el resultado sigue vivo
+            result.expires_at = time.monotonic() + self.ttl
+            self._results.move_to_end(handle)
+        return result
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for handle in [h for h, r in self._results.items() if r.expires_at <= now]:
+            del self._results[handle]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"results": len(self._results), "max_entries": self.max_entries, "ttl": self.ttl}
@@ -0,0 +1,42 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes idénticas en una sola.
+
+    Mientras hay una ejecución en curso para `key`, las llamadas con la misma clave
+    esperan ese mismo futuro en lugar de lanzar otra. Al terminar, la clave se libera
+    y la siguiente llamada vuelve a ejecutar.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        else:
+            self.shared += 1
+
+        # shield: si un cliente cancela, el trabajo compartido sigue para los demás
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict[str, Any]:
+        return {"in_flight": len(self._inflight), "calls": self.calls, "shared": self.shared}
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Evita el aviso "exception was never retrieved" si todos los que esperaban cancelaron
+        if not future.cancelled():
+            future.exception()